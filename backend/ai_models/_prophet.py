@@ -4,6 +4,8 @@ import pandas as pd
 np.float_ = np.float64
 from prophet import Prophet
 
+from ai_models.trading_calendar import future_trading_dates
+
 
 def prophet_model(data):
     df = data[["Datetime", "Close"]].rename(columns={"Datetime": "ds", "Close": "y"})
@@ -16,14 +18,7 @@ def prophet_model(data):
 def prophet_predict(model, number_of_predict_data, data):
     last_date = data["Datetime"].values[-1]
 
-    future_dates = [last_date]
-
-    for i in range(number_of_predict_data):
-        # skip weekends
-        last_date = last_date + pd.DateOffset(1)
-        while last_date.weekday() >= 5:
-            last_date = last_date + pd.DateOffset(1)
-        future_dates.append(last_date.date())
+    future_dates = future_trading_dates(last_date, number_of_predict_data)
 
     future = pd.DataFrame(future_dates, columns=pd.Series(["ds"]))
     forecast = model.predict(future)
@@ -1,6 +1,9 @@
+import numpy as np
 import xgboost
 import pandas as pd
 
+from ai_models.trading_calendar import future_trading_dates
+
 
 def xgboost_model(data):
     dropped_data = data.drop(columns=["Datetime"])
@@ -13,21 +16,46 @@ def xgboost_model(data):
 
 
 def xgboost_predict(model, number_of_predict_data, data):
-    last_data = data.drop(columns=["Datetime"]).values[-1].reshape(1, 6)
-    last_date = data["Datetime"].values[-1]
-
-    prediction = [last_data[0][3]]
-    future_dates = [last_date]
-
-    for i in range(number_of_predict_data):
-        last_data = model.predict(last_data)
-        prediction.append(last_data[0][3])
-
-        # skip weekends
-        last_date = last_date + pd.DateOffset(1)
-        while last_date.weekday() >= 5:
-            last_date = last_date + pd.DateOffset(1)
-        future_dates.append(last_date.date())
+    predicted = xgboost_predict_many({0: model}, number_of_predict_data, {0: data})
+    return predicted[0]
+
+
+def xgboost_predict_many(models, number_of_predict_data, datas):
+    # Advance the recursive forecasts of many tickers in lockstep. At every
+    # step the tickers sharing a fitted model are predicted together in one
+    # inplace_predict call on a (n_tickers x 6) array, without building a
+    # DMatrix each time.
+    tickers = list(datas)
+    last_data = np.stack(
+        [datas[ticker].drop(columns=["Datetime"]).values[-1] for ticker in tickers]
+    ).astype(float)
+
+    prediction = np.empty((len(tickers), number_of_predict_data + 1))
+    prediction[:, 0] = last_data[:, 3]
+
+    groups = {}
+    for i, ticker in enumerate(tickers):
+        model = models[ticker]
+        groups.setdefault(id(model), (model, []))[1].append(i)
+    groups = [
+        (model.get_booster(), model.missing, np.array(rows))
+        for model, rows in groups.values()
+    ]
+
+    # Run one group's whole horizon at a time, switching boosters every
+    # step is slower than the calls it saves
+    for booster, missing, rows in groups:
+        group_data = last_data[rows]
+        for i in range(1, number_of_predict_data + 1):
+            group_data = booster.inplace_predict(group_data, missing=missing)
+            prediction[rows, i] = group_data[:, 3]
+
+    predicted_data = {}
+    for i, ticker in enumerate(tickers):
+        last_date = datas[ticker]["Datetime"].values[-1]
+        future_dates = future_trading_dates(last_date, number_of_predict_data)
+        predicted_data[ticker] = pd.DataFrame(
+            {"Datetime": future_dates, "Close": prediction[i]}
+        )
 
-    predicted_data = pd.DataFrame({"Datetime": future_dates, "Close": prediction})
     return predicted_data
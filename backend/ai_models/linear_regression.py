@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
 from sklearn.linear_model import LinearRegression
 
+from ai_models.trading_calendar import future_trading_dates
+
 
 def linear_model(data):
     X = data["Close"][:-1].values.reshape(-1, 1)
@@ -13,22 +16,18 @@ def linear_model(data):
 
 
 def linear_predict(model, number_of_predict_data, data):
-    last_data = data["Close"].values[-1].reshape(-1, 1)
     last_date = data["Datetime"].values[-1]
+    future_dates = future_trading_dates(last_date, number_of_predict_data)
 
-    prediction = [last_data[0][0]]
-    future_dates = [last_date]
+    # The model is a one-lag line, so each step is close * coef + intercept.
+    # Same arithmetic as model.predict, without sklearn's per-call overhead.
+    coef = model.coef_[0]
+    intercept = model.intercept_
 
+    prediction = np.empty(number_of_predict_data + 1)
+    prediction[0] = data["Close"].values[-1]
     for i in range(number_of_predict_data):
-        last_data = model.predict(last_data)
-        prediction.append(last_data[0])
-        last_data = last_data.reshape(-1, 1)
-
-        # skip weekends
-        last_date = last_date + pd.DateOffset(1)
-        while last_date.weekday() >= 5:
-            last_date = last_date + pd.DateOffset(1)
-        future_dates.append(last_date.date())
+        prediction[i + 1] = prediction[i] * coef + intercept
 
     predicted_data = pd.DataFrame({"Datetime": future_dates, "Close": prediction})
     return predicted_data
@@ -0,0 +1,214 @@
+import asyncio
+import multiprocessing
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ai_models.registry import (
+    BATCH_MODELS,
+    batch_predict_function,
+    model_functions,
+    model_registry,
+)
+
+
+class PoolBusyError(Exception):
+    pass
+
+
+def run_prediction(model: str, data, days_to_predict: int, fitted_model=None):
+    # Runs in a worker process, only fits when no cached model was passed in
+    started_at = time.time()
+
+    fit, predict = model_functions(model)
+
+    fitted = None
+    if fitted_model is None:
+        fitted = fitted_model = fit(data)
+    predicted = predict(fitted_model, days_to_predict, data)
+
+    return fitted, predicted, started_at
+
+
+def run_predictions(model: str, datas: dict, days_to_predict: int, fitted_models=None):
+    # Several tickers of one model in a worker process, keyed by ticker.
+    # Batch models predict them all in one call. A ticker that fails to fit
+    # is reported in errors rather than failing the others.
+    started_at = time.time()
+
+    fit, predict = model_functions(model)
+    fitted_models = dict(fitted_models or {})
+
+    fitted, errors = {}, {}
+    for ticker, data in datas.items():
+        if fitted_models.get(ticker) is None:
+            try:
+                fitted[ticker] = fitted_models[ticker] = fit(data)
+            except Exception as e:
+                errors[ticker] = str(e)
+
+    datas = {ticker: data for ticker, data in datas.items() if ticker not in errors}
+    if model in BATCH_MODELS:
+        predict_many = batch_predict_function(model)
+        predicted = predict_many(fitted_models, days_to_predict, datas) if datas else {}
+    else:
+        predicted = {
+            ticker: predict(fitted_models[ticker], days_to_predict, data)
+            for ticker, data in datas.items()
+        }
+
+    return fitted, predicted, errors, started_at
+
+
+# Bounded process pool that keeps model training off the event loop.
+# Identical concurrent requests share one in-flight job, and once
+# max_pending jobs are queued or running new ones are rejected.
+class PredictionPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = None
+        # Shared by every batch request, so batches never hold every worker
+        self.batch_workers = max(1, workers - 1)
+        self.batch_slots = asyncio.Semaphore(self.batch_workers)
+        # With a single worker a second one is added for single predictions
+        self.processes = max(workers, self.batch_workers + 1)
+        self.inflight = {}
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_executor(self):
+        # Spawned workers don't inherit the server's threads or locks
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self.executor
+
+    async def predict(self, ticker: str, model: str, data, days_to_predict: int):
+        key = (ticker, model, data["Datetime"].values[-1])
+        return await self._schedule(
+            key + (days_to_predict,),
+            lambda: self._run(key, model, data, days_to_predict),
+        )
+
+    async def predict_many(self, model: str, datas: dict, days_to_predict: int):
+        # One job for several tickers, returns (predicted, errors) keyed by ticker
+        keys = {
+            ticker: (ticker, model, data["Datetime"].values[-1])
+            for ticker, data in datas.items()
+        }
+        return await self._schedule(
+            (tuple(keys.values()), days_to_predict),
+            lambda: self._run_many(keys, model, datas, days_to_predict),
+        )
+
+    async def _schedule(self, job, run):
+        if job in self.inflight:
+            self.deduplicated += 1
+            return await asyncio.shield(self.inflight[job])
+
+        if len(self.inflight) >= self.max_pending:
+            self.rejected += 1
+            raise PoolBusyError("Too many predictions in progress")
+
+        task = asyncio.ensure_future(run())
+        task.add_done_callback(lambda _: self.inflight.pop(job, None))
+        self.inflight[job] = task
+        self.submitted += 1
+
+        return await asyncio.shield(task)
+
+    async def _submit(self, function, *args):
+        # A worker that dies (OOM, segfault) breaks the whole executor and
+        # every job queued on it. Replace it and run this job once more.
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, function, *args)
+            except BrokenProcessPool:
+                # Other jobs of the broken executor may have replaced it already
+                if self.executor is executor:
+                    self.executor = None
+                    self.restarts += 1
+                    executor.shutdown(wait=False)
+                if attempt:
+                    raise
+
+    async def _run(self, key, model: str, data, days_to_predict: int):
+        # Models persisted on disk are loaded and saved off the event loop
+        fitted_model = await asyncio.to_thread(model_registry.get, key)
+
+        submitted_at = time.time()
+        fitted, predicted, started_at = await self._submit(
+            run_prediction, model, data, days_to_predict, fitted_model
+        )
+        finished_at = time.time()
+
+        if fitted is not None:
+            await asyncio.to_thread(model_registry.put, key, fitted)
+
+        self._record(submitted_at, started_at, finished_at)
+        return predicted
+
+    async def _run_many(self, keys: dict, model: str, datas: dict, days_to_predict):
+        fitted_models = {
+            ticker: await asyncio.to_thread(model_registry.get, key)
+            for ticker, key in keys.items()
+        }
+
+        submitted_at = time.time()
+        fitted, predicted, errors, started_at = await self._submit(
+            run_predictions, model, datas, days_to_predict, fitted_models
+        )
+        finished_at = time.time()
+
+        for ticker, fitted_model in fitted.items():
+            await asyncio.to_thread(model_registry.put, keys[ticker], fitted_model)
+
+        self._record(submitted_at, started_at, finished_at)
+        return predicted, errors
+
+    def _record(self, submitted_at: float, started_at: float, finished_at: float):
+        wait = max(started_at - submitted_at, 0.0)
+        self.completed += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.total_run += finished_at - started_at
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "processes": self.processes,
+            "max_pending": self.max_pending,
+            "queue_depth": len(self.inflight),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "completed": self.completed,
+            "avg_wait_seconds": (
+                round(self.total_wait / self.completed, 4) if self.completed else None
+            ),
+            "max_wait_seconds": round(self.max_wait, 4),
+            "avg_run_seconds": (
+                round(self.total_run / self.completed, 4) if self.completed else None
+            ),
+        }
+
+
+PREDICT_WORKERS = int(os.getenv("PREDICT_WORKERS", str(os.cpu_count() or 1)))
+
+prediction_pool = PredictionPool(
+    PREDICT_WORKERS, int(os.getenv("PREDICT_MAX_PENDING", str(PREDICT_WORKERS * 4)))
+)
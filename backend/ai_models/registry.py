@@ -0,0 +1,129 @@
+import glob
+import importlib
+import os
+import threading
+import joblib
+
+from collections import OrderedDict
+from functools import lru_cache
+
+# Module, training and prediction function of every supported model. They
+# are imported on first use, the API process itself never trains anything.
+MODELS = {
+    "regression": ("ai_models.linear_regression", "linear_model", "linear_predict"),
+    "xgboost": ("ai_models._xgboost", "xgboost_model", "xgboost_predict"),
+    "prophet": ("ai_models._prophet", "prophet_model", "prophet_predict"),
+}
+
+
+# Models that also predict many tickers in one call, with that function
+BATCH_MODELS = {"xgboost": "xgboost_predict_many"}
+
+
+@lru_cache(maxsize=None)
+def model_functions(model: str):
+    module, fit, predict = MODELS[model]
+    module = importlib.import_module(module)
+    return getattr(module, fit), getattr(module, predict)
+
+
+@lru_cache(maxsize=None)
+def batch_predict_function(model: str):
+    module = importlib.import_module(MODELS[model][0])
+    return getattr(module, BATCH_MODELS[model])
+
+
+# Fitted models keyed by (ticker, model, last trade date). A model is only
+# refit once the seeder has added a newer bar, which changes the key.
+class ModelRegistry:
+    def __init__(self, max_models: int, cache_dir: str | None = None):
+        self.max_models = max_models
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fits = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        ticker, model, last_trade_date = key
+        return os.path.join(
+            self.cache_dir, f"{ticker}_{model}_{last_trade_date}.joblib"
+        )
+
+    def get(self, key):
+        with self.lock:
+            fitted = self.entries.get(key)
+            if fitted is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return fitted
+
+        # Fall back to a model persisted by an earlier process
+        if self.cache_dir and os.path.exists(self._path(key)):
+            try:
+                fitted = joblib.load(self._path(key))
+            except Exception as e:
+                print(f"Error loading cached model {key}: {str(e)}")
+            else:
+                self.put(key, fitted, persist=False)
+                with self.lock:
+                    self.hits += 1
+                return fitted
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, fitted, persist: bool = True):
+        ticker, model, _ = key
+        with self.lock:
+            # Models trained on older data for the same ticker are stale now
+            for stale in [k for k in self.entries if k[:2] == (ticker, model)]:
+                del self.entries[stale]
+
+            self.entries[key] = fitted
+            if persist:
+                self.fits += 1
+            while len(self.entries) > self.max_models:
+                self.entries.popitem(last=False)
+
+        if persist and self.cache_dir:
+            pattern = os.path.join(self.cache_dir, f"{ticker}_{model}_*.joblib")
+            for path in glob.glob(pattern):
+                os.remove(path)
+
+            try:
+                joblib.dump(fitted, self._path(key))
+            except Exception as e:
+                print(f"Error persisting model {key}: {str(e)}")
+
+        return fitted
+
+    def get_or_fit(self, ticker: str, model: str, data):
+        key = (ticker, model, data["Datetime"].values[-1])
+        fitted = self.get(key)
+        if fitted is None:
+            fit = model_functions(model)[0]
+            fitted = self.put(key, fit(data))
+
+        return fitted
+
+    def stats(self):
+        with self.lock:
+            return {
+                "models": len(self.entries),
+                "max_models": self.max_models,
+                "hits": self.hits,
+                "misses": self.misses,
+                "fits": self.fits,
+            }
+
+
+# Set MODEL_CACHE_DIR to also keep fitted models on disk across restarts
+model_registry = ModelRegistry(
+    int(os.getenv("MODEL_CACHE_SIZE", "32")), os.getenv("MODEL_CACHE_DIR")
+)
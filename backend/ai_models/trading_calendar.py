@@ -0,0 +1,82 @@
+import os
+import holidays
+import numpy as np
+import pandas as pd
+
+from datetime import date, datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+# Holiday calendar to skip on top of weekends, "NYSE" by default.
+# Set MARKET_HOLIDAYS to another exchange code known to the holidays
+# package, or to an empty string to only skip weekends.
+MARKET_HOLIDAYS = os.getenv("MARKET_HOLIDAYS", "NYSE")
+
+# Extra closures as comma separated YYYY-MM-DD dates
+EXTRA_MARKET_HOLIDAYS = [
+    np.datetime64(day.strip(), "D")
+    for day in os.getenv("EXTRA_MARKET_HOLIDAYS", "").split(",")
+    if day.strip()
+]
+
+
+# Exchange time zone and regular close, as HH:MM local time
+MARKET_TIMEZONE = ZoneInfo(os.getenv("MARKET_TIMEZONE", "America/New_York"))
+MARKET_CLOSE = tuple(
+    int(part) for part in os.getenv("MARKET_CLOSE", "16:00").split(":")
+)
+
+
+@lru_cache(maxsize=64)
+def market_holidays(start_year: int, end_year: int):
+    years = range(start_year, end_year + 1)
+    closed = list(EXTRA_MARKET_HOLIDAYS)
+    if MARKET_HOLIDAYS:
+        closed += [
+            np.datetime64(day, "D")
+            for day in holidays.financial_holidays(MARKET_HOLIDAYS, years=years)
+        ]
+
+    return np.array(sorted(closed), dtype="datetime64[D]")
+
+
+@lru_cache(maxsize=1024)
+def _future_trading_dates(last_date: date, horizon: int):
+    # ~252 sessions a year, leave room for the longest horizons
+    end_year = last_date.year + horizon // 200 + 1
+    closed = market_holidays(last_date.year, end_year)
+
+    # Rolling back first keeps offset 1 on the first session after last_date,
+    # also when last_date is a weekend or holiday
+    sessions = np.busday_offset(
+        np.datetime64(last_date, "D"),
+        np.arange(1, horizon + 1),
+        roll="backward",
+        holidays=closed,
+    )
+    return (last_date, *sessions.astype(object))
+
+
+def future_trading_dates(last_date, horizon: int):
+    # last_date followed by the next `horizon` trading sessions
+    last_date = pd.Timestamp(last_date).date()
+    return list(_future_trading_dates(last_date, horizon))
+
+
+def is_trading_day(day: date) -> bool:
+    return bool(np.is_busday(day, holidays=market_holidays(day.year, day.year)))
+
+
+def last_closed_session(now: datetime) -> date:
+    # Latest session whose close is at or before now, its bar is final
+    local = now.astimezone(MARKET_TIMEZONE)
+    today = local.date()
+    closed = market_holidays(today.year - 1, today.year)
+
+    if is_trading_day(today) and (local.hour, local.minute) >= MARKET_CLOSE:
+        return today
+
+    offset = -1 if is_trading_day(today) else 0
+    return np.busday_offset(today, offset, roll="backward", holidays=closed).astype(
+        object
+    )
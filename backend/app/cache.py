@@ -0,0 +1,149 @@
+import asyncio
+import os
+import threading
+import asyncpg
+
+from collections import OrderedDict
+from typing import Optional
+
+from .prices import INTERVALS, PriceHistory
+from .stores import price_store
+
+# Postgres channel the seeder notifies with every ticker it wrote bars for
+PRICES_CHANNEL = "prices_updated"
+
+
+# LRU cache of full per-ticker price histories, keyed by ticker for daily bars
+# and (ticker, interval) for rollups. The data only changes when the seeder
+# runs, which notifies API processes to invalidate what it touched.
+# Misses are read outside the lock. Every invalidation bumps a generation,
+# so a read that started before it isn't cached after it.
+class PriceCache:
+    def __init__(self, max_tickers: int):
+        self.max_tickers = max_tickers
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.cleared = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key) -> Optional[PriceHistory]:
+        with self.lock:
+            history = self.entries.get(key)
+            if history is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return history
+
+    def generation(self, ticker: str):
+        # Taken before reading a miss from the store, and handed to put
+        with self.lock:
+            return self.cleared, self.generations.get(ticker, 0)
+
+    def put(self, key, history: PriceHistory, generation=None) -> PriceHistory:
+        ticker = key if isinstance(key, str) else key[0]
+        with self.lock:
+            current = self.cleared, self.generations.get(ticker, 0)
+            if generation is not None and generation != current:
+                return history
+
+            self.entries[key] = history
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_tickers:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+        return history
+
+    def invalidate(self, ticker: Optional[str] = None):
+        with self.lock:
+            if ticker is None:
+                self.entries.clear()
+                self.cleared += 1
+            else:
+                self.generations[ticker] = self.generations.get(ticker, 0) + 1
+                self.entries.pop(ticker, None)
+                for interval in INTERVALS[1:]:
+                    self.entries.pop((ticker, interval), None)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "tickers": len(self.entries),
+                "max_tickers": self.max_tickers,
+                "rows": sum(len(history) for history in self.entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+price_cache = PriceCache(int(os.getenv("PRICE_CACHE_SIZE", "128")))
+
+
+def get_price_history(db, ticker: str, interval: str = "daily") -> PriceHistory:
+    # Full history of the ticker, loaded from the price store on a miss
+    key = ticker if interval == "daily" else (ticker, interval)
+    generation = price_cache.generation(ticker)
+    history = price_cache.get(key)
+    if history is None:
+        history = price_store.read(db, ticker, interval)
+        price_cache.put(key, history, generation)
+
+    return history
+
+
+def get_price_range(
+    db, ticker: str, interval: str, start_date, end_date
+) -> PriceHistory:
+    # Bars between start_date and end_date. A range can start or end mid
+    # period, which the rollups don't cover, so its bars are aggregated from
+    # the daily ones inside it.
+    daily = get_price_history(db, ticker).slice(start_date, end_date)
+    return daily.resample(interval)
+
+
+def get_price_histories(db, tickers) -> dict:
+    # Cached histories, with every miss loaded together in one query
+    generations = {ticker: price_cache.generation(ticker) for ticker in tickers}
+    histories = {ticker: price_cache.get(ticker) for ticker in tickers}
+    misses = [ticker for ticker, history in histories.items() if history is None]
+    if misses:
+        for ticker, history in price_store.read_many(db, misses).items():
+            histories[ticker] = price_cache.put(ticker, history, generations[ticker])
+
+    return histories
+
+
+async def listen_for_price_updates(dsn: str, retry: float = 5):
+    # Keep a LISTEN connection open for the seeder's notifications
+    while True:
+        try:
+            conn = await asyncpg.connect(dsn)
+        except Exception as e:
+            print(f"Error listening for price updates: {str(e)}")
+            await asyncio.sleep(retry)
+            continue
+
+        closed = asyncio.Event()
+        try:
+            conn.add_termination_listener(lambda _: closed.set())
+            await conn.add_listener(
+                PRICES_CHANNEL, lambda *args: price_cache.invalidate(args[-1])
+            )
+            # Updates may have been missed while disconnected
+            price_cache.invalidate()
+            await closed.wait()
+        finally:
+            await conn.close()
+
+        print("Price update listener disconnected, reconnecting.")
+        await asyncio.sleep(retry)
@@ -2,14 +2,57 @@ import os
 
 import dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 dotenv.load_dotenv()
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+# Connections kept open per engine, plus how many more may be opened under load
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+
+def async_database_url(url: str):
+    # Same database through asyncpg, which spells libpq's sslmode as ssl
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    if "sslmode" in url.query:
+        url = url.update_query_dict(
+            {"ssl": url.query["sslmode"]}
+        ).difference_update_query(["sslmode"])
+    return url
+
+
+def asyncpg_dsn(url: str):
+    # For plain asyncpg connections outside the pool, like LISTEN. Unlike the
+    # SQLAlchemy dialect, asyncpg.connect reads sslmode from the DSN itself and
+    # would send an ssl parameter to the server as a setting.
+    return (
+        make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+    )
+
+
+# Used by the seeder, the forecaster and the sync endpoints
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by the async endpoints, so queries don't block the event loop
+async_engine = create_async_engine(
+    async_database_url(SQLALCHEMY_DATABASE_URL),
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -19,3 +62,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
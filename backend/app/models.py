@@ -4,7 +4,9 @@ from sqlalchemy import (
     UUID,
     Column,
     Date,
+    DateTime,
     Float,
+    Index,
     Integer,
     UniqueConstraint,
     String,
@@ -30,9 +32,65 @@ class Stock(Base):
 
     __table_args__ = (
         UniqueConstraint("ticker", "trade_date", name="uq_ticker_trade_date"),
+        # Covering index for price history reads (index-only scans)
+        Index(
+            "ix_stocks_ticker_trade_date",
+            "ticker",
+            "trade_date",
+            postgresql_include=[
+                "open_price",
+                "high_price",
+                "low_price",
+                "close_price",
+                "volume",
+            ],
+        ),
     )
 
 
+class Prediction(Base):
+    __tablename__ = "predictions"
+
+    id = Column(UUID, primary_key=True, default=uuid4)
+    ticker = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    base_date = Column(Date, nullable=False)  # Last trade date the model saw
+    trade_date = Column(Date, nullable=False)
+    predicted_price = Column(Float)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "ticker", "model", "trade_date", name="uq_ticker_model_trade_date"
+        ),
+    )
+
+
+# Weekly and monthly bars aggregated from stocks, refreshed by the seeder for
+# the periods its new rows fall in
+class StockRollup(Base):
+    __tablename__ = "stock_rollups"
+
+    ticker = Column(String, primary_key=True)
+    interval = Column(String, primary_key=True)  # "weekly" or "monthly"
+    period_start = Column(Date, primary_key=True)  # Monday or first of the month
+    trade_date = Column(Date, nullable=False)  # First trading day of the period
+    open_price = Column(Float)
+    high_price = Column(Float)
+    low_price = Column(Float)
+    close_price = Column(Float)
+    volume = Column(Float)
+
+
+# Seeding progress per ticker, so runs only ask upstream for missing sessions
+class TickerFreshness(Base):
+    __tablename__ = "ticker_freshness"
+
+    ticker = Column(String, primary_key=True)
+    last_trade_date = Column(Date)  # Latest bar stored
+    checked_session = Column(Date, nullable=False)  # Latest session fetched up to
+    checked_at = Column(DateTime(timezone=True), nullable=False)
+
+
 # USER
 class User(Base):
     __tablename__ = "users"
@@ -42,6 +100,8 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     balance = Column(Float, default=0.0, nullable=False)
+    # Bumped on every change to transactions or watchlist, tags /users/details
+    details_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     transactions = relationship("Transaction", back_populates="user")
     holdings = relationship("StockHolding", back_populates="user")
@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+import orjson
+
+from datetime import date
+from itertools import groupby
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import Stock, StockRollup
+
+# Columns served by the price history endpoints, all covered by the
+# ix_stocks_ticker_trade_date index so reads never touch the heap
+PRICE_COLUMNS = [
+    Stock.ticker,
+    Stock.trade_date,
+    Stock.open_price,
+    Stock.high_price,
+    Stock.low_price,
+    Stock.close_price,
+    Stock.volume,
+]
+PRICE_FIELDS = [column.key for column in PRICE_COLUMNS]
+VALUE_FIELDS = PRICE_FIELDS[2:]
+
+# Same columns of the weekly and monthly bars
+ROLLUP_COLUMNS = [getattr(StockRollup, field) for field in PRICE_FIELDS]
+
+# Bar sizes the price history endpoints can aggregate daily bars into
+INTERVALS = ("daily", "weekly", "monthly")
+
+
+def period_starts(trade_date: np.ndarray, interval: str) -> np.ndarray:
+    # Monday of the week or first of the month every date falls in
+    if interval == "weekly":
+        # 1970-01-01 was a Thursday
+        days = trade_date.astype(np.int64)
+        return (days - (days + 3) % 7).astype("datetime64[D]")
+
+    return trade_date.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: keeps the first and last points, and from
+    # each bucket in between the point forming the largest triangle with the
+    # previously kept point and the average of the next bucket
+    size = len(x)
+    if max_points >= size or max_points < 3:
+        return np.arange(size)
+
+    edges = np.linspace(1, size - 1, max_points - 1).astype(int)
+    counts = np.diff(edges)
+    next_x = np.append((np.add.reduceat(x[1:-1], edges[:-1] - 1) / counts)[1:], x[-1])
+    next_y = np.append((np.add.reduceat(y[1:-1], edges[:-1] - 1) / counts)[1:], y[-1])
+
+    # Each pick depends on the previous one, so this part is a plain loop.
+    # Over Python floats it is several times faster than NumPy calls on
+    # buckets of a handful of points.
+    xs, ys = x.tolist(), y.tolist()
+    bounds = edges.tolist()
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, size - 1
+    a = 0
+    for i, (nx, ny) in enumerate(zip(next_x.tolist(), next_y.tolist())):
+        # Twice the triangle's area is |y * c1 + x * c2 + c3|
+        c1 = xs[a] - nx
+        c2 = ny - ys[a]
+        c3 = nx * ys[a] - xs[a] * ny
+        largest = -1.0
+        for j in range(bounds[i], bounds[i + 1]):
+            area = abs(ys[j] * c1 + xs[j] * c2 + c3)
+            if area > largest:
+                largest, a = area, j
+        selected[i + 1] = a
+
+    return selected
+
+
+# Price history of one ticker as one NumPy array per column, sorted by date
+class PriceHistory:
+    def __init__(self, ticker: str, trade_date: np.ndarray, values: dict):
+        self.ticker = ticker
+        self.trade_date = trade_date.astype("datetime64[D]")
+        self.values = {
+            field: np.asarray(values[field], dtype=float) for field in VALUE_FIELDS
+        }
+
+    @classmethod
+    def from_rows(cls, ticker: str, rows):
+        columns = list(zip(*rows)) or [()] * len(PRICE_FIELDS)
+        values = {
+            field: np.array(column, dtype=float)
+            for field, column in zip(VALUE_FIELDS, columns[2:])
+        }
+        return cls(ticker, np.array(columns[1], dtype="datetime64[D]"), values)
+
+    @classmethod
+    def from_frame(cls, ticker: str, frame: pd.DataFrame):
+        trade_date = np.array(frame["trade_date"].tolist(), dtype="datetime64[D]")
+        values = {field: frame[field].to_numpy(dtype=float) for field in VALUE_FIELDS}
+        return cls(ticker, trade_date, values)
+
+    def __len__(self):
+        return len(self.trade_date)
+
+    @property
+    def last_trade_date(self) -> Optional[date]:
+        return self.trade_date[-1].astype(object) if len(self) else None
+
+    def _take(self, index):
+        values = {field: column[index] for field, column in self.values.items()}
+        return PriceHistory(self.ticker, self.trade_date[index], values)
+
+    def slice(self, start_date: Optional[date] = None, end_date: Optional[date] = None):
+        # Binary search on the sorted date array
+        lo, hi = 0, len(self)
+        if start_date is not None:
+            lo = np.searchsorted(self.trade_date, np.datetime64(start_date, "D"))
+        if end_date is not None:
+            hi = np.searchsorted(
+                self.trade_date, np.datetime64(end_date, "D"), side="right"
+            )
+        return self._take(slice(lo, hi))
+
+    def resample(self, interval: str):
+        # Aggregate daily bars into weekly or monthly ones, each dated by the
+        # first trading day of its period
+        if interval == "daily" or not len(self):
+            return self
+
+        keys = period_starts(self.trade_date, interval)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(self)] - 1
+
+        values = {
+            "open_price": self.values["open_price"][starts],
+            "high_price": np.fmax.reduceat(self.values["high_price"], starts),
+            "low_price": np.fmin.reduceat(self.values["low_price"], starts),
+            "close_price": self.values["close_price"][ends],
+            "volume": np.add.reduceat(np.nan_to_num(self.values["volume"]), starts),
+        }
+        return PriceHistory(self.ticker, self.trade_date[starts], values)
+
+    def downsample(self, max_points: int):
+        # At most max_points bars, chosen to keep the shape of the close line
+        x = self.trade_date.astype(np.int64).astype(float)
+        y = np.nan_to_num(self.values["close_price"])
+        return self._take(lttb_indices(x, y, max_points))
+
+    def append(self, other: "PriceHistory"):
+        # Only keep the bars that are newer than what we already have
+        if len(self):
+            other = other._take(other.trade_date > self.trade_date[-1])
+        if not len(other):
+            return self
+
+        values = {
+            field: np.concatenate([self.values[field], other.values[field]])
+            for field in VALUE_FIELDS
+        }
+        trade_date = np.concatenate([self.trade_date, other.trade_date])
+        return PriceHistory(self.ticker, trade_date, values)
+
+    def columns(self):
+        columns = {"ticker": self.ticker, "trade_date": self.trade_date.tolist()}
+        columns.update(
+            (field, column.tolist()) for field, column in self.values.items()
+        )
+        return columns
+
+    def to_frame(self) -> pd.DataFrame:
+        # Same layout as the yfinance frames the models were written against
+        return pd.DataFrame(
+            {
+                "Datetime": self.trade_date.astype(object),
+                "Open": self.values["open_price"],
+                "High": self.values["high_price"],
+                "Low": self.values["low_price"],
+                "Close": self.values["close_price"],
+                "Adj Close": self.values["close_price"],
+                "Volume": self.values["volume"],
+            }
+        )
+
+    def records_json(self) -> bytes:
+        # [{"ticker": ..., "trade_date": ..., ...}, ...]
+        columns = self.columns()
+        ticker = columns.pop("ticker")
+        return orjson.dumps(
+            [dict(zip(PRICE_FIELDS, (ticker, *row))) for row in zip(*columns.values())]
+        )
+
+    def columnar_json(self) -> bytes:
+        # {"ticker": ..., "trade_date": [...], "open_price": [...], ...}
+        return orjson.dumps(self.columns())
+
+
+def read_price_history(db: Session, ticker: str):
+    # Plain column tuples, no ORM objects or identity map
+    rows = db.execute(
+        select(*PRICE_COLUMNS)
+        .where(Stock.ticker == ticker)
+        .order_by(Stock.trade_date.asc())
+    ).all()
+    return PriceHistory.from_rows(ticker, rows)
+
+
+def read_rollup_history(db: Session, ticker: str, interval: str):
+    rows = db.execute(
+        select(*ROLLUP_COLUMNS)
+        .where(StockRollup.ticker == ticker, StockRollup.interval == interval)
+        .order_by(StockRollup.period_start.asc())
+    ).all()
+    return PriceHistory.from_rows(ticker, rows)
+
+
+def read_price_histories(db: Session, tickers):
+    # Histories of several tickers in a single query
+    rows = db.execute(
+        select(*PRICE_COLUMNS)
+        .where(Stock.ticker.in_(tickers))
+        .order_by(Stock.ticker.asc(), Stock.trade_date.asc())
+    ).all()
+
+    histories = {ticker: PriceHistory.from_rows(ticker, []) for ticker in tickers}
+    for ticker, ticker_rows in groupby(rows, key=lambda row: row[0]):
+        histories[ticker] = PriceHistory.from_rows(ticker, list(ticker_rows))
+
+    return histories
@@ -0,0 +1,210 @@
+import os
+import random
+import threading
+import time
+import yfinance as yf
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+
+
+def build_quote(ticker: str, quote_data: dict):
+    open = quote_data.get("regularMarketOpen", 0)
+    previousClose = quote_data.get("regularMarketPreviousClose", 0)
+    currentPrice = quote_data.get("currentPrice", 0)
+    change = round(currentPrice - previousClose, 2)
+    changePercent = round(change / previousClose * 100, 2)
+
+    return {
+        "ticker": quote_data.get("symbol", ticker),
+        "shortName": quote_data.get("shortName", ticker),
+        "longName": quote_data.get("longName", ticker),
+        "open": open,
+        "previousClose": previousClose,
+        "currentPrice": currentPrice,
+        "change": change,
+        "changePercent": changePercent,
+    }
+
+
+class YahooQuoteProvider:
+    def fetch(self, ticker: str):
+        # Fetch summary information using yfinance
+        return build_quote(ticker, yf.Ticker(ticker).info)
+
+    def fetch_top_holdings(self, fund: str):
+        return yf.Ticker(fund).funds_data.top_holdings.index.tolist()
+
+
+# Random walk quotes with a configurable delay, for load tests and local runs
+class StubQuoteProvider:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.prices = {}
+        self.lock = threading.Lock()
+
+    def fetch(self, ticker: str):
+        time.sleep(self.latency)
+
+        with self.lock:
+            previous = self.prices.get(ticker, random.uniform(50, 500))
+            self.prices[ticker] = previous * random.uniform(0.99, 1.01)
+            price = self.prices[ticker]
+
+        return build_quote(
+            ticker,
+            {
+                "symbol": ticker,
+                "regularMarketOpen": round(previous, 2),
+                "regularMarketPreviousClose": round(previous, 2),
+                "currentPrice": round(price, 2),
+            },
+        )
+
+    def fetch_top_holdings(self, fund: str):
+        time.sleep(self.latency)
+        return ["NVDA", "AAPL", "MSFT", "AMZN", "META", "GOOGL", "AVGO", "GOOG"]
+
+
+# Quotes cached for `ttl` seconds. Concurrent misses for a ticker share one
+# upstream call, and quotes up to `stale_ttl` old are served immediately while
+# a background refresh runs.
+class QuoteService:
+    def __init__(self, provider, ttl: float, stale_ttl: float, workers: int = 8):
+        self.provider = provider
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.entries = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.errors = 0
+
+    def _refresh(self, ticker: str) -> Future:
+        # Start a single upstream call for the ticker, caller holds the lock
+        future = self.inflight.get(ticker)
+        if future is None:
+            future = Future()
+            self.inflight[ticker] = future
+            self.upstream_calls += 1
+            self.executor.submit(self._fetch, ticker, future)
+        return future
+
+    def _fetch(self, ticker: str, future: Future):
+        try:
+            quote = self.provider.fetch(ticker)
+        except Exception as e:
+            with self.lock:
+                self.errors += 1
+                self.inflight.pop(ticker, None)
+            future.set_exception(e)
+        else:
+            with self.lock:
+                self.entries[ticker] = (quote, time.monotonic())
+                self.inflight.pop(ticker, None)
+            future.set_result(quote)
+
+    def _lookup(self, ticker: str):
+        # The cached quote, or the future of the upstream call that brings it
+        with self.lock:
+            quote, fetched_at = self.entries.get(ticker, (None, 0.0))
+            age = time.monotonic() - fetched_at
+
+            if quote is not None and age < self.ttl:
+                self.hits += 1
+                return quote
+
+            if quote is not None and age < self.stale_ttl:
+                self.stale_hits += 1
+                self._refresh(ticker)
+                return quote
+
+            if ticker in self.inflight:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+            return self._refresh(ticker)
+
+    def get(self, ticker: str):
+        quote = self._lookup(ticker)
+        return quote.result() if isinstance(quote, Future) else quote
+
+    def refresh(self, ticker: str) -> Future:
+        # Fetch a fresh quote regardless of its age, shared with calls in flight
+        with self.lock:
+            return self._refresh(ticker)
+
+    def get_many(self, tickers):
+        # Start every upstream call before waiting, so they run concurrently
+        quotes = [self._lookup(ticker) for ticker in tickers]
+        return [
+            quote.result() if isinstance(quote, Future) else quote for quote in quotes
+        ]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "tickers": len(self.entries),
+                "ttl_seconds": self.ttl,
+                "stale_ttl_seconds": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "upstream_calls": self.upstream_calls,
+                "inflight": len(self.inflight),
+                "errors": self.errors,
+            }
+
+
+# Quotes of the fund's top holdings. The holdings list is refreshed once a
+# day and the assembled payload is reused for `ttl` seconds.
+class TopStocksService:
+    def __init__(self, quotes: QuoteService, fund: str, ttl: float):
+        self.quotes = quotes
+        self.fund = fund
+        self.ttl = ttl
+        self.holdings = (None, [])
+        self.payload = (None, 0.0)
+        self.lock = threading.Lock()
+
+    def get(self):
+        # Concurrent callers wait for the one building the payload
+        with self.lock:
+            payload, built_at = self.payload
+            if payload is not None and time.monotonic() - built_at < self.ttl:
+                return payload
+
+            today = date.today()
+            if self.holdings[0] != today:
+                top_tickers = self.quotes.provider.fetch_top_holdings(self.fund)
+                self.holdings = (today, top_tickers)
+
+            payload = self.quotes.get_many(self.holdings[1])
+            self.payload = (payload, time.monotonic())
+            return payload
+
+
+def get_quote_provider():
+    # Set QUOTE_PROVIDER=stub to serve simulated quotes instead of Yahoo
+    if os.getenv("QUOTE_PROVIDER", "yahoo") == "stub":
+        return StubQuoteProvider(float(os.getenv("QUOTE_STUB_LATENCY", "0")))
+
+    return YahooQuoteProvider()
+
+
+quote_service = QuoteService(
+    get_quote_provider(),
+    ttl=float(os.getenv("QUOTE_TTL", "15")),
+    stale_ttl=float(os.getenv("QUOTE_STALE_TTL", "300")),
+)
+
+# sp500 ETF
+top_stocks_service = TopStocksService(
+    quote_service, "SPY", ttl=float(os.getenv("TOP_STOCKS_TTL", "60"))
+)
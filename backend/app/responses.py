@@ -0,0 +1,44 @@
+import orjson
+import uuid
+import pandas as pd
+
+from fastapi import Response
+
+# orjson writes dates, UUIDs and NumPy arrays natively
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+
+def encode_default(obj):
+    # asyncpg returns its own subclass of UUID, which orjson doesn't take
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError
+
+
+# Fast path for the hot read endpoints. Returning a Response directly skips
+# jsonable_encoder and response_model validation, which walk every object.
+# Endpoints opt in by building plain dicts, tuples or arrays themselves.
+def json_response(content, headers=None) -> Response:
+    return Response(
+        orjson.dumps(content, default=encode_default, option=JSON_OPTIONS),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def schema_records(fields, rows):
+    # Rows of column tuples as dicts keyed like a response schema
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def prediction_records(predicted: pd.DataFrame, **extra):
+    # [{"trade_date": ..., "predicted_price": ..., **extra}, ...] built from
+    # whole columns instead of DataFrame.to_dict. Models return dates or
+    # Timestamps (Prophet), which orjson doesn't take, so both become dates.
+    return [
+        {"trade_date": trade_date, "predicted_price": price, **extra}
+        for trade_date, price in zip(
+            pd.to_datetime(predicted["Datetime"]).dt.date.tolist(),
+            predicted["Close"].to_numpy(dtype=float).tolist(),
+        )
+    ]
@@ -1,7 +1,10 @@
 from datetime import date
-from pydantic import UUID4, BaseModel, EmailStr
+from pydantic import UUID4, BaseModel, EmailStr, Field
 from typing import List, Optional
 
+# Longest horizon, in trading days, a prediction may ask for
+MAX_DAYS_TO_PREDICT = 365
+
 
 class UserCreate(BaseModel):
     username: str
@@ -103,3 +106,10 @@ class StockOut(StockBase):
 
     class Config:
         from_attributes = True
+
+
+class BatchPredictionRequest(BaseModel):
+    tickers: List[str] = []
+    source: Optional[str] = None  # 'watchlist' or 'holdings' of the current user
+    model: str
+    days_to_predict: int = Field(ge=0, le=MAX_DAYS_TO_PREDICT)
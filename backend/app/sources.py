@@ -0,0 +1,57 @@
+import os
+import pandas as pd
+import yfinance as yf
+
+from datetime import date, timedelta
+from typing import Optional
+
+PRICE_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+# Daily bars from Yahoo Finance. Uses Ticker.history rather than yf.download,
+# since yf.download keeps its results in module-level state and is not safe to
+# call from several threads at once.
+class YahooSource:
+    def fetch(
+        self, ticker: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> pd.DataFrame:
+        if start is None:
+            # Fetch the latest 5 year of stock data
+            data = yf.Ticker(ticker).history(period="5y", auto_adjust=False)
+        else:
+            # Yahoo's end date is exclusive
+            end = (end or date.today()) + timedelta(days=1)
+            data = yf.Ticker(ticker).history(start=start, end=end, auto_adjust=False)
+
+        return data.reindex(columns=PRICE_FIELDS)
+
+
+# Daily bars read from <directory>/<ticker>.csv, to stand in for Yahoo in
+# benchmarks and tests. Files need a Date column plus the PRICE_FIELDS columns.
+class FixtureSource:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(
+        self, ticker: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> pd.DataFrame:
+        path = os.path.join(self.directory, f"{ticker}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=PRICE_FIELDS, index=pd.DatetimeIndex([]))
+
+        data = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+        if start is not None:
+            data = data[data.index >= pd.Timestamp(start)]
+        if end is not None:
+            data = data[data.index <= pd.Timestamp(end)]
+
+        return data.reindex(columns=PRICE_FIELDS)
+
+
+def get_source():
+    # Set SEED_FIXTURE_DIR to seed from local CSV files instead of Yahoo
+    fixture_dir = os.getenv("SEED_FIXTURE_DIR")
+    if fixture_dir:
+        return FixtureSource(fixture_dir)
+
+    return YahooSource()
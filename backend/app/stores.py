@@ -0,0 +1,258 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from .models import Stock
+from .prices import (
+    VALUE_FIELDS,
+    PriceHistory,
+    period_starts,
+    read_price_histories,
+    read_price_history,
+    read_rollup_history,
+)
+
+# Where price history is kept, "sql" for the stocks table or "arrow" for one
+# memory-mapped file per ticker under PRICE_STORE_DIR
+PRICE_STORE = os.getenv("PRICE_STORE", "sql")
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", "data/prices")
+
+STOCK_COLUMNS = ["ticker", "trade_date", *VALUE_FIELDS]
+
+# Bar sizes kept pre-aggregated, with their date_trunc field
+ROLLUP_INTERVALS = {"weekly": "week", "monthly": "month"}
+
+# Recomputes one ticker's bars of an interval from its stocks rows, starting
+# with the period of the earliest staged row
+REFRESH_ROLLUPS = """
+INSERT INTO stock_rollups (
+    ticker, interval, period_start, trade_date,
+    open_price, high_price, low_price, close_price, volume
+)
+SELECT
+    ticker,
+    :interval,
+    date_trunc(:field, trade_date)::date,
+    min(trade_date),
+    (array_agg(open_price ORDER BY trade_date))[1],
+    max(high_price),
+    min(low_price),
+    (array_agg(close_price ORDER BY trade_date DESC))[1],
+    coalesce(sum(volume), 0)
+FROM stocks
+WHERE ticker = :ticker
+    AND trade_date >= (SELECT date_trunc(:field, min(trade_date)) FROM stocks_staging)
+GROUP BY ticker, date_trunc(:field, trade_date)
+ON CONFLICT (ticker, interval, period_start) DO UPDATE SET
+    trade_date = excluded.trade_date,
+    open_price = excluded.open_price,
+    high_price = excluded.high_price,
+    low_price = excluded.low_price,
+    close_price = excluded.close_price,
+    volume = excluded.volume
+"""
+
+
+# Daily bars in the stocks table, one row per ticker and day, with weekly and
+# monthly bars in stock_rollups
+class SqlPriceStore:
+    def read(self, db: Session, ticker: str, interval: str = "daily") -> PriceHistory:
+        if interval in ROLLUP_INTERVALS:
+            return read_rollup_history(db, ticker, interval)
+        return read_price_history(db, ticker)
+
+    def read_many(self, db: Session, tickers) -> dict:
+        return read_price_histories(db, tickers)
+
+    def latest_trade_dates(self, db: Session, tickers=None) -> dict:
+        # Latest bar of the given tickers, or of every stored ticker
+        query = select(Stock.ticker, func.max(Stock.trade_date)).group_by(Stock.ticker)
+        if tickers is None:
+            return dict(db.execute(query).all())
+
+        latest_trade_dates = dict.fromkeys(tickers)
+        latest_trade_dates.update(
+            db.execute(query.where(Stock.ticker.in_(tickers))).all()
+        )
+        return latest_trade_dates
+
+    def write(self, db: Session, ticker: str, frame: pd.DataFrame) -> int:
+        # NaN is written as an empty field, which COPY reads as NULL
+        buffer = io.StringIO()
+        frame.to_csv(buffer, index=False, header=False, columns=STOCK_COLUMNS)
+        buffer.seek(0)
+
+        # COPY into a staging table, then merge into stocks in one statement
+        columns = ", ".join(STOCK_COLUMNS)
+        db.execute(
+            text(
+                "CREATE TEMP TABLE IF NOT EXISTS stocks_staging ("
+                "ticker varchar, trade_date date, open_price float, "
+                "high_price float, low_price float, close_price float, volume float"
+                ") ON COMMIT DELETE ROWS"
+            )
+        )
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY stocks_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        result = db.execute(
+            text(
+                f"INSERT INTO stocks (id, {columns}) "
+                f"SELECT gen_random_uuid(), {columns} FROM stocks_staging "
+                "ON CONFLICT (ticker, trade_date) DO NOTHING"
+            )
+        )  # Handle conflicts by doing nothing
+        inserted = result.rowcount
+
+        # Only the periods the new rows fall in change
+        if inserted:
+            for interval, field in ROLLUP_INTERVALS.items():
+                db.execute(
+                    text(REFRESH_ROLLUPS),
+                    {"ticker": ticker, "interval": interval, "field": field},
+                )
+
+        return inserted
+
+
+# Daily bars in <directory>/<ticker>.arrow, an uncompressed Arrow IPC file
+# with a date32 trade_date column and one float64 column per price field,
+# and rollups in <directory>/<interval>/<ticker>.arrow.
+# Files are memory-mapped, so reads hand out NumPy views of the page cache
+# rather than building rows. Writers replace the whole file, which keeps
+# readers that still map the old one consistent.
+class ArrowPriceStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.schema = pa.schema(
+            [("trade_date", pa.date32())]
+            + [(field, pa.float64()) for field in VALUE_FIELDS]
+        )
+
+    def path(self, ticker: str, interval: str = "daily"):
+        if interval in ROLLUP_INTERVALS:
+            return os.path.join(self.directory, interval, f"{ticker}.arrow")
+        return os.path.join(self.directory, f"{ticker}.arrow")
+
+    def read(self, db: Session, ticker: str, interval: str = "daily") -> PriceHistory:
+        path = self.path(ticker, interval)
+        if not os.path.exists(path):
+            # Rollups of tickers copied over before they were kept
+            if interval in ROLLUP_INTERVALS:
+                return self.read(db, ticker).resample(interval)
+            return PriceHistory.from_rows(ticker, [])
+
+        # Buffers keep the mapping alive after the file is closed
+        with pa.memory_map(path) as source:
+            batch = pa.ipc.open_file(source).get_batch(0)
+
+        # Only the dates are converted, the price columns are zero-copy
+        values = {
+            field: batch.column(field).to_numpy(zero_copy_only=True)
+            for field in VALUE_FIELDS
+        }
+        trade_date = batch.column("trade_date").to_numpy(zero_copy_only=False)
+        return PriceHistory(ticker, trade_date, values)
+
+    def read_many(self, db: Session, tickers) -> dict:
+        return {ticker: self.read(db, ticker) for ticker in tickers}
+
+    def stored_tickers(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name[: -len(".arrow")]
+            for name in os.listdir(self.directory)
+            if name.endswith(".arrow")
+        )
+
+    def latest_trade_dates(self, db: Session, tickers=None) -> dict:
+        if tickers is None:
+            tickers = self.stored_tickers()
+        return {ticker: self.read(db, ticker).last_trade_date for ticker in tickers}
+
+    def write(self, db: Session, ticker: str, frame: pd.DataFrame) -> int:
+        stored = self.read(db, ticker)
+        new_rows = PriceHistory.from_frame(ticker, frame)
+
+        # Stored bars win over refetched ones, like ON CONFLICT DO NOTHING
+        trade_date = np.concatenate([stored.trade_date, new_rows.trade_date])
+        trade_date, index = np.unique(trade_date, return_index=True)
+        inserted = len(trade_date) - len(stored)
+        if not inserted:
+            return 0
+
+        values = {
+            field: np.concatenate([stored.values[field], new_rows.values[field]])[index]
+            for field in VALUE_FIELDS
+        }
+        merged = PriceHistory(ticker, trade_date, values)
+        self.save(self.path(ticker), merged)
+
+        # Only the periods from the earliest new row on change
+        for interval in ROLLUP_INTERVALS:
+            path = self.path(ticker, interval)
+            if not os.path.exists(path):
+                self.save(path, merged.resample(interval))
+                continue
+
+            first = period_starts(new_rows.trade_date.min(keepdims=True), interval)[0]
+            kept = self.read(db, ticker, interval).slice(
+                end_date=first - np.timedelta64(1, "D")
+            )
+            self.save(path, kept.append(merged.slice(first).resample(interval)))
+
+        return inserted
+
+    def save(self, path: str, history: PriceHistory):
+        batch = pa.record_batch(
+            [pa.array(history.trade_date, type=pa.date32())]
+            + [pa.array(history.values[field]) for field in VALUE_FIELDS],
+            schema=self.schema,
+        )
+
+        # Written aside and renamed over, readers never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with pa.OSFile(f"{path}.tmp", "wb") as sink:
+            with pa.ipc.new_file(sink, self.schema) as writer:
+                writer.write_batch(batch)
+        os.replace(f"{path}.tmp", path)
+
+
+def get_price_store():
+    if PRICE_STORE == "sql":
+        return SqlPriceStore()
+    if PRICE_STORE == "arrow":
+        return ArrowPriceStore(PRICE_STORE_DIR)
+
+    raise ValueError(f"Unknown price store: {PRICE_STORE}")
+
+
+price_store = get_price_store()
+
+
+if __name__ == "__main__":
+    # Copy the stocks table into the Arrow store, one ticker at a time
+    from .database import SessionLocal
+
+    source = SqlPriceStore()
+    target = ArrowPriceStore(PRICE_STORE_DIR)
+
+    db = SessionLocal()
+    try:
+        for ticker in source.latest_trade_dates(db):
+            history = source.read(db, ticker)
+            frame = pd.DataFrame(
+                {"ticker": ticker, "trade_date": history.trade_date.astype(object)}
+                | history.values
+            )
+            inserted = target.write(db, ticker, frame)
+            print(f"Copied {inserted} rows of {ticker} to {target.path(ticker)}.")
+    finally:
+        db.close()
@@ -0,0 +1,135 @@
+import asyncio
+import os
+
+from app.quotes import QuoteService, quote_service
+
+
+# One connection's view of the feed. Updates for a ticker overwrite each
+# other until they are sent, and batches go out at most every min_interval.
+class Subscription:
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.tickers = set()
+        self.pending = {}
+        self.ready = asyncio.Event()
+        self.last_sent = 0.0
+        self.coalesced = 0
+
+    def publish(self, quote: dict):
+        if quote["ticker"] in self.pending:
+            self.coalesced += 1
+        self.pending[quote["ticker"]] = quote
+        self.ready.set()
+
+    async def next_batch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.ready.wait()
+
+            delay = self.last_sent + self.min_interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            self.ready.clear()
+            # Unsubscribing may have emptied the queue in the meantime
+            if self.pending:
+                batch = list(self.pending.values())
+                self.pending = {}
+                self.last_sent = loop.time()
+                return batch
+
+
+# Fans quotes out to every subscribed connection. Each ticker with at least
+# one subscriber has a single poller, so upstream calls grow with the number
+# of tickers rather than the number of clients.
+class QuoteBroadcaster:
+    def __init__(self, quotes: QuoteService, interval: float, min_interval: float):
+        self.quotes = quotes
+        self.interval = interval
+        self.min_interval = min_interval
+        self.subscribers = {}
+        self.pollers = {}
+        self.latest = {}
+        self.connections = 0
+        self.published = 0
+        self.errors = 0
+
+    def connect(self):
+        self.connections += 1
+        return Subscription(self.min_interval)
+
+    def disconnect(self, subscription: Subscription):
+        self.unsubscribe(subscription, list(subscription.tickers))
+        self.connections -= 1
+
+    def subscribe(self, subscription: Subscription, tickers):
+        for ticker in tickers:
+            if ticker in subscription.tickers:
+                continue
+
+            subscription.tickers.add(ticker)
+            self.subscribers.setdefault(ticker, set()).add(subscription)
+
+            # New subscribers get the last known quote right away
+            if ticker in self.latest:
+                subscription.publish(self.latest[ticker])
+
+            if ticker not in self.pollers:
+                self.pollers[ticker] = asyncio.create_task(self._poll(ticker))
+
+    def unsubscribe(self, subscription: Subscription, tickers):
+        for ticker in tickers:
+            subscription.tickers.discard(ticker)
+            subscription.pending.pop(ticker, None)
+
+            subscribers = self.subscribers.get(ticker)
+            if subscribers is None:
+                continue
+
+            subscribers.discard(subscription)
+            # Stop polling tickers nobody is watching anymore
+            if not subscribers:
+                del self.subscribers[ticker]
+                self.pollers.pop(ticker).cancel()
+                self.latest.pop(ticker, None)
+
+    async def _poll(self, ticker: str):
+        while True:
+            try:
+                # Shielded, other requests may be waiting on the same call
+                quote = await asyncio.shield(
+                    asyncio.wrap_future(self.quotes.refresh(ticker))
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"Error polling quote for {ticker}: {str(e)}")
+            else:
+                if quote != self.latest.get(ticker):
+                    self.latest[ticker] = quote
+                    self.published += 1
+                    for subscription in self.subscribers.get(ticker, ()):
+                        subscription.publish(quote)
+
+            await asyncio.sleep(self.interval)
+
+    def stats(self):
+        return {
+            "connections": self.connections,
+            "tickers": len(self.pollers),
+            "poll_interval_seconds": self.interval,
+            "min_send_interval_seconds": self.min_interval,
+            "published": self.published,
+            "errors": self.errors,
+        }
+
+
+# Most tickers a single stream connection may watch
+MAX_STREAM_TICKERS = int(os.getenv("QUOTE_STREAM_MAX_TICKERS", "50"))
+
+quote_broadcaster = QuoteBroadcaster(
+    quote_service,
+    interval=float(os.getenv("QUOTE_STREAM_INTERVAL", "5")),
+    min_interval=float(os.getenv("QUOTE_STREAM_MIN_INTERVAL", "1")),
+)
@@ -0,0 +1,164 @@
+import asyncio
+import csv
+import os
+import threading
+import time
+import pandas as pd
+
+from typing import NamedTuple, Optional
+
+SP500_URL = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Bundled copy of the constituents, so the app boots without the network.
+# Regenerate it with `python -m app.universe`.
+SNAPSHOT_PATH = os.path.join(DATA_DIR, "sp500.csv")
+
+# More universes as comma separated name=path.csv pairs, in the snapshot's
+# Symbol,Security,GICS Sector layout
+EXTRA_UNIVERSES = dict(
+    entry.strip().split("=", 1)
+    for entry in os.getenv("EXTRA_UNIVERSES", "").split(",")
+    if entry.strip()
+)
+
+# Seconds between refreshes from Wikipedia, 0 to only use the snapshot
+UNIVERSE_REFRESH_INTERVAL = float(os.getenv("UNIVERSE_REFRESH_INTERVAL", "86400"))
+
+# Index levels, charted and quoted but not traded
+BENCHMARKS = {"^GSPC": "S&P 500"}
+
+
+class TickerInfo(NamedTuple):
+    ticker: str
+    name: str
+    sector: Optional[str]
+    indexes: frozenset
+    tradable: bool = True
+
+
+def canonical_ticker(ticker: str) -> str:
+    # Some ticker like "BRK.B" need to be mapped to "BRK-B"
+    return ticker.strip().upper().replace(".", "-")
+
+
+def read_snapshot(path: str):
+    with open(path, newline="") as f:
+        return {
+            canonical_ticker(row["Symbol"]): (
+                row["Security"],
+                row.get("GICS Sector") or None,
+            )
+            for row in csv.DictReader(f)
+        }
+
+
+def fetch_sp500():
+    df_sp500 = pd.read_html(SP500_URL)[0]
+    return {
+        canonical_ticker(symbol): (name, sector)
+        for symbol, name, sector in zip(
+            df_sp500.Symbol, df_sp500.Security, df_sp500["GICS Sector"]
+        )
+    }
+
+
+# Every ticker the API and the seeder accept, with its metadata. Lookups
+# hit a dict, and the whole mapping is swapped at once when a refresh lands.
+class TickerUniverse:
+    def __init__(self):
+        self.members = {}
+        self.infos = {}
+        self.tickers = frozenset()
+        self.loaded_at = None
+        self.refreshes = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self.tickers
+
+    def __iter__(self):
+        return iter(self.tickers)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def lookup(self, ticker: str) -> Optional[TickerInfo]:
+        return self.infos.get(canonical_ticker(ticker))
+
+    def tradable(self) -> frozenset:
+        return frozenset(ticker for ticker, info in self.infos.items() if info.tradable)
+
+    def set_index(self, index: str, members: dict):
+        # members maps ticker -> (name, sector)
+        with self.lock:
+            self.members[index] = dict(members)
+
+            infos = {
+                ticker: TickerInfo(ticker, name, None, frozenset(), tradable=False)
+                for ticker, name in BENCHMARKS.items()
+            }
+            for index_name, index_members in self.members.items():
+                for ticker, (name, sector) in index_members.items():
+                    info = infos.get(ticker)
+                    indexes = frozenset([index_name])
+                    if info is not None:
+                        indexes |= info.indexes
+                        sector = sector or info.sector
+                    infos[ticker] = TickerInfo(ticker, name, sector, indexes)
+
+            self.infos = infos
+            self.tickers = frozenset(infos)
+            self.loaded_at = time.time()
+
+    def save_snapshot(self, index: str, path: str):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Symbol", "Security", "GICS Sector"])
+            for ticker, (name, sector) in sorted(self.members[index].items()):
+                writer.writerow([ticker, name, sector or ""])
+
+    def refresh(self):
+        members = fetch_sp500()
+
+        # A half-parsed page shouldn't shrink the universe
+        if len(members) < len(self.members.get("S&P 500", {})) // 2:
+            raise ValueError(f"Only {len(members)} tickers found")
+
+        self.set_index("S&P 500", members)
+        self.refreshes += 1
+
+    async def refresh_periodically(self, interval: float):
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+                print(f"Refreshed ticker universe, {len(self)} tickers.")
+            except Exception as e:
+                self.errors += 1
+                print(f"Error refreshing ticker universe: {str(e)}")
+
+            await asyncio.sleep(interval)
+
+    def stats(self):
+        return {
+            "tickers": len(self.tickers),
+            "indexes": {index: len(members) for index, members in self.members.items()},
+            "loaded_at": self.loaded_at,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
+
+
+ticker_universe = TickerUniverse()
+ticker_universe.set_index("S&P 500", read_snapshot(SNAPSHOT_PATH))
+for index, path in EXTRA_UNIVERSES.items():
+    ticker_universe.set_index(index, read_snapshot(path))
+
+
+if __name__ == "__main__":
+    ticker_universe.refresh()
+    ticker_universe.save_snapshot("S&P 500", SNAPSHOT_PATH)
+    members = ticker_universe.members["S&P 500"]
+    print(f"Saved {len(members)} tickers to {SNAPSHOT_PATH}.")
@@ -0,0 +1,101 @@
+# Concurrent load against the authenticated database endpoints.
+#
+#   python benchmarks/api_load.py --url http://127.0.0.1:8000 --concurrency 64
+#
+# Registers a throwaway user, then keeps `concurrency` requests in flight
+# for `duration` seconds per endpoint. Prints req/s and latencies of the
+# successful requests, and failed ones separately by status or exception.
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from collections import Counter
+
+ENDPOINTS = ["/users/me", "/watchlist", "/users/details"]
+
+
+async def login(client: httpx.AsyncClient):
+    username = f"bench-{uuid.uuid4().hex[:8]}"
+    password = "benchmark"
+
+    response = await client.post(
+        "/register",
+        json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": password,
+        },
+    )
+    response.raise_for_status()
+
+    response = await client.post(
+        "/token", data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run(client: httpx.AsyncClient, path: str, concurrency: int, duration: float):
+    latencies = []
+    errors = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+                continue
+
+            # Fast 4xx/5xx responses would flatter both throughput and latency
+            if response.status_code != 200:
+                errors[response.status_code] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    failed = ", ".join(f"{error}: {count}" for error, count in errors.most_common())
+    failed = f"errors {sum(errors.values())}" + (f" ({failed})" if failed else "")
+
+    if not latencies:
+        print(f"{path:<16} no successful requests, {failed}")
+        return
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(
+        f"{path:<16} {len(latencies) / elapsed:>9.1f} req/s"
+        f"  p50 {p50:>7.1f} ms  p99 {p99:>7.1f} ms  {failed}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=30.0
+    ) as client:
+        token = await login(client)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        print(f"{args.concurrency} concurrent requests, {args.duration:.0f}s each")
+        for path in ENDPOINTS:
+            await run(client, path, args.concurrency, args.duration)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+# Response serialization, FastAPI's default path against the orjson fast path.
+#
+#   python benchmarks/serialization.py --rows 1000 10000 100000
+#
+# Runs in process on generated data, no database or server needed. The
+# default path is what FastAPI does with a returned object: validate it
+# against the response_model, dump it to JSON-able Python and json.dumps it.
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+import numpy as np
+import pandas as pd
+
+from datetime import date, timedelta
+from typing import List
+from types import SimpleNamespace
+
+# Run as a script, which puts benchmarks/ rather than the backend on sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app import schemas
+from app.prices import PRICE_FIELDS, PriceHistory
+from app.responses import json_response, prediction_records, schema_records
+
+
+def default_render(content) -> bytes:
+    # Same separators and encoding as FastAPI's JSONResponse
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def price_history(rows: int) -> PriceHistory:
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(rows).cumsum()
+    values = {
+        "open_price": close + rng.standard_normal(rows),
+        "high_price": close + 2,
+        "low_price": close - 2,
+        "close_price": close,
+        "volume": rng.integers(1_000_000, 50_000_000, rows).astype(float),
+    }
+    trade_date = np.datetime64("1990-01-01") + np.arange(rows)
+    return PriceHistory("AAPL", trade_date, values)
+
+
+def transactions(rows: int):
+    user_id = uuid.uuid4()
+    start = date(1990, 1, 1)
+    return [
+        (uuid.uuid4(), user_id, "buy", "AAPL", 10, 123.45 + i, start + timedelta(i))
+        for i in range(rows)
+    ]
+
+
+def predictions(rows: int) -> pd.DataFrame:
+    start = date(2025, 1, 1)
+    return pd.DataFrame(
+        {
+            "Datetime": [start + timedelta(i) for i in range(rows)],
+            "Close": np.linspace(100, 200, rows),
+        }
+    )
+
+
+def cases(rows: int):
+    # (payload, default path, fast path, same document), each path returning
+    # the response bytes
+    history = price_history(rows)
+
+    def history_default():
+        # Rows as objects, encoded one by one
+        records = [
+            SimpleNamespace(**dict(zip(PRICE_FIELDS, ("AAPL", *row))))
+            for row in zip(
+                history.trade_date.astype(object),
+                *(history.values[field].tolist() for field in PRICE_FIELDS[2:]),
+            )
+        ]
+        return default_render(
+            jsonable_encoder(
+                [{f: getattr(r, f) for f in PRICE_FIELDS} for r in records]
+            )
+        )
+
+    rows_of_transactions = transactions(rows)
+    fields = list(schemas.Transaction.model_fields)
+    adapter = TypeAdapter(List[schemas.Transaction])
+
+    def transactions_default():
+        objects = [
+            SimpleNamespace(**dict(zip(fields, row))) for row in rows_of_transactions
+        ]
+        validated = adapter.validate_python(objects, from_attributes=True)
+        return default_render(adapter.dump_python(validated, mode="json"))
+
+    def transactions_fast():
+        return json_response(schema_records(fields, rows_of_transactions)).body
+
+    predicted = predictions(rows)
+
+    def predictions_default():
+        frame = predicted.rename(
+            columns={"Datetime": "trade_date", "Close": "predicted_price"}
+        )
+        frame["ticker"] = "AAPL"
+        frame["model"] = "xgboost"
+        return default_render(jsonable_encoder(frame.to_dict(orient="records")))
+
+    def predictions_fast():
+        records = prediction_records(predicted, ticker="AAPL", model="xgboost")
+        return json_response(records).body
+
+    return [
+        ("price history", history_default, history.records_json, True),
+        ("price history, columnar", history_default, history.columnar_json, False),
+        ("transactions", transactions_default, transactions_fast, True),
+        ("predictions", predictions_default, predictions_fast, True),
+    ]
+
+
+def timed(fn, repeat: int):
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'payload':<24} {'rows':>7}  {'default':>10}  {'fast':>9}  {'speedup':>7}"
+        f"  {'bytes':>10}"
+    )
+    for rows in args.rows:
+        for name, default, fast, same_document in cases(rows):
+            default_seconds, default_body = timed(default, args.repeat)
+            fast_seconds, fast_body = timed(fast, args.repeat)
+
+            if same_document:
+                assert json.loads(default_body) == json.loads(fast_body), name
+
+            print(
+                f"{name:<24} {rows:>7}  {default_seconds * 1000:>8.2f}ms"
+                f"  {fast_seconds * 1000:>7.2f}ms  {default_seconds / fast_seconds:>6.1f}x"
+                f"  {len(fast_body):>10,}"
+            )
+
+
+if __name__ == "__main__":
+    main()
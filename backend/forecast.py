@@ -0,0 +1,200 @@
+import multiprocessing
+import os
+import time
+import pandas as pd
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from itertools import groupby
+
+from app.database import SessionLocal
+from app.models import Prediction
+from app.stores import price_store
+from app.universe import ticker_universe
+from ai_models.pool import run_predictions
+from ai_models.registry import BATCH_MODELS, MODELS
+
+# Longest horizon served from the predictions table
+FORECAST_HORIZON = 365
+
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(os.cpu_count() or 1)))
+
+
+def plan_forecasts(db: Session):
+    # Every (ticker, model) whose stored forecast predates the latest bar.
+    # Indexes like ^GSPC are stored but can't be predicted, so are skipped.
+    tradable = ticker_universe.tradable()
+    latest_trade_dates = price_store.latest_trade_dates(db)
+    forecast_dates = {
+        (ticker, model): base_date
+        for ticker, model, base_date in db.query(
+            Prediction.ticker, Prediction.model, func.max(Prediction.base_date)
+        )
+        .group_by(Prediction.ticker, Prediction.model)
+        .all()
+    }
+
+    return [
+        (ticker, model, latest_trade_date)
+        for ticker, latest_trade_date in latest_trade_dates.items()
+        if ticker in tradable
+        for model in MODELS
+        if forecast_dates.get((ticker, model)) != latest_trade_date
+    ]
+
+
+def group_forecasts(jobs, workers: int):
+    # Jobs as (model, {ticker: base_date}) groups. Tickers of a batch model
+    # are split into one group per worker and predicted together, the others
+    # get a group each.
+    groups = []
+    for model in MODELS:
+        base_dates = [
+            (ticker, base_date)
+            for ticker, job_model, base_date in jobs
+            if job_model == model
+        ]
+        size = 1
+        if model in BATCH_MODELS:
+            size = max(1, -(-len(base_dates) // workers))
+        for i in range(0, len(base_dates), size):
+            groups.append((model, dict(base_dates[i : i + size])))
+
+    return groups
+
+
+def write_forecast(
+    ticker: str, model: str, base_date: date, predicted: pd.DataFrame, db: Session
+):
+    records = [
+        {
+            "ticker": ticker,
+            "model": model,
+            "base_date": base_date,
+            "trade_date": trade_date,
+            "predicted_price": price,
+        }
+        for trade_date, price in zip(
+            pd.to_datetime(predicted["Datetime"]).dt.date,
+            predicted["Close"].astype(float).tolist(),
+        )
+    ]
+
+    # Replace the previous forecast of this ticker and model
+    db.execute(
+        delete(Prediction).where(Prediction.ticker == ticker, Prediction.model == model)
+    )
+    db.execute(insert(Prediction), records)
+    db.commit()
+
+
+def forecast_data(workers: int = FORECAST_WORKERS):
+    db = SessionLocal()
+
+    print("\n======================\nForecasting...\n======================\n")
+
+    start = time.perf_counter()
+    jobs = plan_forecasts(db)
+    histories = {}
+    errors = 0
+
+    try:
+        # Fit every model of every ticker across all cores
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {}
+            for model, base_dates in group_forecasts(jobs, workers):
+                for ticker in base_dates:
+                    if ticker not in histories:
+                        histories[ticker] = price_store.read(db, ticker).to_frame()
+                future = executor.submit(
+                    run_predictions,
+                    model,
+                    {ticker: histories[ticker] for ticker in base_dates},
+                    FORECAST_HORIZON,
+                )
+                futures[future] = (model, base_dates)
+
+            for future in as_completed(futures):
+                model, base_dates = futures[future]
+                try:
+                    _, predicted, failed, _ = future.result()
+                except Exception as e:
+                    predicted, failed = {}, dict.fromkeys(base_dates, str(e))
+
+                for ticker, base_date in base_dates.items():
+                    try:
+                        if ticker in failed:
+                            raise ValueError(failed[ticker])
+                        write_forecast(ticker, model, base_date, predicted[ticker], db)
+                        print(f"Forecast {ticker} with {model} from {base_date}.")
+                    except Exception as e:
+                        db.rollback()
+                        errors += 1
+                        print(f"Error forecasting {ticker} with {model}: {str(e)}")
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Made {len(jobs)} forecasts in {elapsed:.2f}s.")
+
+    return {"forecasts": len(jobs), "errors": errors, "seconds": round(elapsed, 2)}
+
+
+def read_forecast(
+    db: Session, ticker: str, model: str, base_date: date, days_to_predict: int
+):
+    # Stored forecast made from base_date, or None if it is stale or too short
+    if days_to_predict > FORECAST_HORIZON:
+        return None
+
+    rows = db.execute(
+        select(Prediction.trade_date, Prediction.predicted_price)
+        .where(
+            Prediction.ticker == ticker,
+            Prediction.model == model,
+            Prediction.base_date == base_date,
+        )
+        .order_by(Prediction.trade_date.asc())
+        .limit(days_to_predict + 1)
+    ).all()
+
+    if len(rows) < days_to_predict + 1:
+        return None
+
+    return pd.DataFrame(rows, columns=["Datetime", "Close"])
+
+
+def read_forecasts(db: Session, model: str, base_dates: dict, days_to_predict: int):
+    # Stored forecasts of several tickers in one query, keyed by ticker.
+    # Tickers whose forecast is stale or too short are left out.
+    if days_to_predict > FORECAST_HORIZON or not base_dates:
+        return {}
+
+    rows = db.execute(
+        select(
+            Prediction.ticker,
+            Prediction.base_date,
+            Prediction.trade_date,
+            Prediction.predicted_price,
+        )
+        .where(Prediction.ticker.in_(base_dates), Prediction.model == model)
+        .order_by(Prediction.ticker.asc(), Prediction.trade_date.asc())
+    ).all()
+
+    forecasts = {}
+    for ticker, ticker_rows in groupby(rows, key=lambda row: row[0]):
+        fresh = [row[2:] for row in ticker_rows if row[1] == base_dates[ticker]]
+        if len(fresh) > days_to_predict:
+            forecasts[ticker] = pd.DataFrame(
+                fresh[: days_to_predict + 1], columns=["Datetime", "Close"]
+            )
+
+    return forecasts
+
+
+if __name__ == "__main__":
+    forecast_data()
@@ -1,36 +1,93 @@
-import time
-import threading
-from pandas.core.api import DataFrame
+import asyncio
+import orjson
 import uvicorn
-import yfinance as yf
-import pandas as pd
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import (
+    FastAPI,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import and_
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
 from typing import List, Optional
 from datetime import date, datetime
 
-from app.database import engine, get_db
+from app.database import (
+    SQLALCHEMY_DATABASE_URL,
+    asyncpg_dsn,
+    engine,
+    get_async_db,
+    get_db,
+)
 from app import models, schemas, auth
+from app.middleware import CompressionMiddleware
+from app.cache import (
+    get_price_histories,
+    get_price_history,
+    get_price_range,
+    listen_for_price_updates,
+    price_cache,
+)
+from app.prices import INTERVALS
+from app.quotes import quote_service, top_stocks_service
+from app.responses import (
+    encode_default,
+    json_response,
+    prediction_records,
+    schema_records,
+)
+from app.streaming import MAX_STREAM_TICKERS, quote_broadcaster
+from app.universe import (
+    UNIVERSE_REFRESH_INTERVAL,
+    canonical_ticker,
+    ticker_universe,
+)
 
-from seed import seed_data
+from forecast import read_forecast, read_forecasts
 
-from ai_models.linear_regression import linear_model, linear_predict
-from ai_models._xgboost import xgboost_model, xgboost_predict
-from ai_models._prophet import prophet_model, prophet_predict
+from ai_models.registry import BATCH_MODELS, MODELS, model_registry
+from ai_models.pool import PoolBusyError, prediction_pool
 
-df_sp500 = pd.read_html("https://en.wikipedia.org/wiki/List_of_S%26P_500_companies")[0]
-tickers_sp500 = df_sp500.Symbol.to_list()  # List of tickers in SP500
 
-# Some ticker like "BRK.B" need to be mapped to "BRK-B"
-tickers_sp500 = list(map(lambda x: x.replace(".", "-"), tickers_sp500))
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(models.Base.metadata.create_all, bind=engine)
 
-models.Base.metadata.create_all(bind=engine)
+    # Seeding runs in its own process (python -m seed --daemon), which tells
+    # this one which cached histories to drop
+    tasks = [
+        asyncio.create_task(
+            listen_for_price_updates(asyncpg_dsn(SQLALCHEMY_DATABASE_URL))
+        )
+    ]
 
-app = FastAPI()
+    # Serve the bundled S&P 500 snapshot until a refresh lands
+    if UNIVERSE_REFRESH_INTERVAL > 0:
+        tasks.append(
+            asyncio.create_task(
+                ticker_universe.refresh_periodically(UNIVERSE_REFRESH_INTERVAL)
+            )
+        )
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -43,79 +100,144 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
+)
+
+# Compress everything except the streamed responses
+app.add_middleware(
+    CompressionMiddleware, streaming_paths=["/quotes/stream", "/predict/batch"]
 )
 
 # Define the OAuth2 scheme for token-based authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+# Most tickers a single batch prediction may ask for
+MAX_BATCH_TICKERS = 100
+
+# Most tickers predicted in one pool job, so batch results stream out as
+# groups complete and single predictions never wait behind a whole batch
+MAX_BATCH_GROUP = 8
+
+# Fewest points a downsampled chart may ask for, the first, last and one between
+MIN_CHART_POINTS = 3
+
+
+def validate_ticker(ticker: str, tradable: bool = True) -> str:
+    # Canonical form of a known ticker, index levels are only charted and quoted
+    info = ticker_universe.lookup(ticker)
+    if info is None or (tradable and not info.tradable):
+        raise HTTPException(status_code=400, detail="Ticker not found")
+    return info.ticker
+
+
+def not_modified(request: Request, etag: str, private: bool = False):
+    # Headers for a response tagged with etag, and a 304 response if the
+    # client's copy already has it. Clients revalidate before every reuse.
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache" if private else "no-cache",
+    }
+
+    # Weak comparison, gzip changes the bytes but not what they represent
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or etag.removeprefix("W/") in tags:
+            return headers, Response(status_code=304, headers=headers)
+
+    return headers, None
+
+
+def schema_query(schema, model):
+    # Selects the columns of model named like the fields of schema
+    return select(*(getattr(model, field) for field in schema.model_fields))
 
 
 # STOCKS
+@app.get("/tickers")
+def list_tickers():
+    return [
+        {
+            "ticker": info.ticker,
+            "name": info.name,
+            "sector": info.sector,
+            "indexes": sorted(info.indexes),
+            "tradable": info.tradable,
+        }
+        for info in sorted(ticker_universe.infos.values())
+    ]
+
+
 @app.get("/stocks/{ticker}")
 def read_stock_data(
     ticker: str,
+    request: Request,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    format: str = "json",
+    interval: str = "daily",
+    max_points: Optional[int] = None,
     db: Session = Depends(get_db),
 ):
-    ticker_upper = ticker.upper()
+    ticker_upper = validate_ticker(ticker, tradable=False)
 
-    if (ticker_upper not in tickers_sp500) and (ticker_upper != "^GSPC"):
-        raise HTTPException(status_code=400, detail="Ticker not found")
+    if format not in ("json", "columnar"):
+        raise HTTPException(status_code=400, detail="Unsupported format")
 
-    query = db.query(models.Stock).filter(models.Stock.ticker == ticker_upper)
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail="Unsupported interval")
 
-    # Set default end_date to today if not provided
-    if end_date is None:
-        end_date = datetime.now().date()
+    if max_points is not None and max_points < MIN_CHART_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"max_points must be at least {MIN_CHART_POINTS}",
+        )
+
+    # Every view of the ticker changes only when a new daily bar lands
+    last_trade_date = get_price_history(db, ticker_upper).last_trade_date
+    headers, response = not_modified(request, f'W/"{ticker_upper}-{last_trade_date}"')
+    if last_trade_date and response:
+        return response
 
     # Filter by date range if start_date is provided
     if start_date:
-        query = query.filter(
-            and_(
-                models.Stock.trade_date >= start_date,
-                models.Stock.trade_date <= end_date,
-            )
-        )
+        # Set default end_date to today if not provided
+        if end_date is None:
+            end_date = datetime.now().date()
 
-    # Execute the query
-    stocks = query.all()
+        stocks = get_price_range(db, ticker_upper, interval, start_date, end_date)
+    else:
+        # Weekly and monthly bars come pre-aggregated
+        stocks = get_price_history(db, ticker_upper, interval)
 
-    if not stocks:
+    if not len(stocks):
         raise HTTPException(
             status_code=404, detail="No stocks found for the given criteria"
         )
 
-    return stocks
+    # Long ranges have more bars than a chart can show
+    if max_points is not None:
+        stocks = stocks.downsample(max_points)
+
+    # Serialize straight to bytes, skipping FastAPI's per-object encoding
+    if format == "columnar":
+        return Response(
+            stocks.columnar_json(), media_type="application/json", headers=headers
+        )
+
+    return Response(
+        stocks.records_json(), media_type="application/json", headers=headers
+    )
 
 
 @app.get("/stocks/{ticker}/quote")
 def get_stock_quote(ticker: str):
-    ticker_upper = ticker.upper()
-
-    if (ticker_upper not in tickers_sp500) and (ticker_upper != "^GSPC"):
-        raise HTTPException(status_code=400, detail="Ticker not found")
+    ticker_upper = validate_ticker(ticker, tradable=False)
 
     try:
-        stock = yf.Ticker(ticker_upper)
-        # Fetch summary information using yfinance
-        quote_data = stock.info
-
-        open = quote_data.get("regularMarketOpen", 0)
-        previousClose = quote_data.get("regularMarketPreviousClose", 0)
-        currentPrice = quote_data.get("currentPrice", 0)
-        change = round(currentPrice - previousClose, 2)
-        changePercent = round(change / previousClose * 100, 2)
-
-        return {
-            "ticker": quote_data.get("symbol", ticker_upper),
-            "shortName": quote_data.get("shortName", ticker_upper),
-            "longName": quote_data.get("longName", ticker_upper),
-            "open": open,
-            "previousClose": previousClose,
-            "currentPrice": currentPrice,
-            "change": change,
-            "changePercent": changePercent,
-        }
+        # Cached, with concurrent misses sharing one upstream call
+        return quote_service.get(ticker_upper)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error fetching stock data: {str(e)}"
@@ -124,114 +246,194 @@ def get_stock_quote(ticker: str):
 
 @app.get("/stocks/{ticker}/predict")
 async def get_stock_prediction(
-    ticker: str, days_to_predict: int, model: str, db: Session = Depends(get_db)
+    ticker: str,
+    model: str,
+    request: Request,
+    days_to_predict: int = Query(..., ge=0, le=schemas.MAX_DAYS_TO_PREDICT),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    ticker_upper = ticker.upper()
-
-    if ticker_upper not in tickers_sp500:
-        raise HTTPException(status_code=400, detail="Ticker not found")
+    ticker_upper = validate_ticker(ticker)
 
-    stocks = db.query(models.Stock).filter(models.Stock.ticker == ticker_upper).all()
-    if not stocks:
+    stocks = await db.run_sync(get_price_history, ticker_upper)
+    if not len(stocks):
         raise HTTPException(
             status_code=404, detail="No stocks found for the given criteria"
         )
 
-    data = [
-        {
-            "Datetime": stock.trade_date,
-            "Open": stock.open_price,
-            "High": stock.high_price,
-            "Low": stock.low_price,
-            "Close": stock.close_price,
-            "Adj Close": stock.close_price,  # Assuming Adj Close is the same as Close
-            "Volume": stock.volume,
-        }
-        for stock in stocks
-    ]
+    if model not in MODELS:
+        raise HTTPException(status_code=404, detail="No model found for prediction")
 
-    # Convert list of dictionaries to DataFrame
-    data = pd.DataFrame(list(data))
+    # Predictions only change with the bars they are made from
+    headers, cached = not_modified(
+        request, f'W/"{ticker_upper}-{model}-{stocks.last_trade_date}"'
+    )
+    if cached:
+        return cached
 
-    predicted = DataFrame()
+    # Serve the nightly forecast if it was made from the latest bar
+    predicted = await db.run_sync(
+        read_forecast, ticker_upper, model, stocks.last_trade_date, days_to_predict
+    )
 
-    # train data
-    if model == "regression":
-        _linear_model = linear_model(data)
-        predicted = linear_predict(_linear_model, days_to_predict, data)
+    # Otherwise train and predict in the process pool
+    if predicted is None:
+        # Adj Close is assumed to be the same as Close
+        data = stocks.to_frame()
+        try:
+            predicted = await prediction_pool.predict(
+                ticker_upper, model, data, days_to_predict
+            )
+        except PoolBusyError as e:
+            raise HTTPException(
+                status_code=503, detail=str(e), headers={"Retry-After": "5"}
+            )
 
-    elif model == "xgboost":
-        _xgboost_model = xgboost_model(data)
-        predicted = xgboost_predict(_xgboost_model, days_to_predict, data)
+    return json_response(
+        prediction_records(predicted, ticker=ticker, model=model), headers=headers
+    )
 
-    elif model == "prophet":
-        _prophet_model = prophet_model(data)
-        predicted = prophet_predict(_prophet_model, days_to_predict, data)
 
-    else:
-        raise HTTPException(status_code=404, detail="No model found for prediction")
+@app.get("/top-stocks")
+def get_top_stocks():
+    try:
+        # Holdings cached for the day, quotes fetched concurrently
+        return top_stocks_service.get()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching stock data: {str(e)}"
+        )
+
 
-    predicted = predicted.rename(
-        columns={"Datetime": "trade_date", "Close": "predicted_price"}
+# QUOTE STREAMING
+def parse_stream_tickers(tickers: str):
+    # Comma separated tickers, returns (valid, unknown)
+    requested = list(
+        dict.fromkeys(canonical_ticker(t) for t in tickers.split(",") if t.strip())
     )
-    predicted["ticker"] = ticker
-    predicted["model"] = model
+    valid = [t for t in requested if t in ticker_universe]
+    unknown = [t for t in requested if t not in ticker_universe]
+    return valid, unknown
 
-    predictions = predicted.to_dict(orient="records")
-    return predictions
 
+# Server-Sent Events, the watchlist is fixed for the lifetime of the stream
+@app.get("/quotes/stream")
+async def stream_quotes(tickers: str):
+    valid, unknown = parse_stream_tickers(tickers)
 
-@app.get("/top-stocks")
-async def get_top_stocks():
-    try:
-        spy = yf.Ticker("SPY")  # sp500 ETF
-        data = spy.funds_data
-        top_tickers = data.top_holdings.index.tolist()
-        print(top_tickers)
-
-        quotes = []
-
-        for ticker in top_tickers:
-            stock = yf.Ticker(ticker)
-            # Fetch summary information using yfinance
-            quote_data = stock.info
-
-            open = quote_data.get("regularMarketOpen", 0)
-            previousClose = quote_data.get("regularMarketPreviousClose", 0)
-            currentPrice = quote_data.get("currentPrice", 0)
-            change = round(currentPrice - previousClose, 2)
-            changePercent = round(change / previousClose * 100, 2)
-
-            quotes.append(
-                {
-                    "ticker": quote_data.get("symbol", ticker),
-                    "shortName": quote_data.get("shortName", ticker),
-                    "longName": quote_data.get("longName", ticker),
-                    "open": open,
-                    "previousClose": previousClose,
-                    "currentPrice": currentPrice,
-                    "change": change,
-                    "changePercent": changePercent,
-                }
-            )
-
-        return quotes
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Ticker not found: {', '.join(unknown)}"
+        )
 
-    except Exception as e:
+    if not valid or len(valid) > MAX_STREAM_TICKERS:
         raise HTTPException(
-            status_code=500, detail=f"Error fetching stock data: {str(e)}"
+            status_code=400,
+            detail=f"Stream between 1 and {MAX_STREAM_TICKERS} tickers",
         )
 
+    subscription = quote_broadcaster.connect()
+    quote_broadcaster.subscribe(subscription, valid)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    batch = await asyncio.wait_for(subscription.next_batch(), 15)
+                except asyncio.TimeoutError:
+                    # Comment line, keeps proxies from closing an idle stream
+                    yield b": keep-alive\n\n"
+                else:
+                    yield b"data: " + orjson.dumps({"quotes": batch}) + b"\n\n"
+        finally:
+            quote_broadcaster.disconnect(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# WebSocket, clients change their watchlist with messages like
+# {"action": "subscribe", "tickers": ["AAPL"]} or {"action": "unsubscribe", ...}
+@app.websocket("/ws/quotes")
+async def stream_quotes_ws(websocket: WebSocket, tickers: str = ""):
+    await websocket.accept()
+    subscription = quote_broadcaster.connect()
+
+    async def send_error(detail: str):
+        await websocket.send_text(orjson.dumps({"error": detail}).decode())
+
+    async def subscribe(requested: str):
+        valid, unknown = parse_stream_tickers(requested)
+        if unknown:
+            await send_error(f"Ticker not found: {', '.join(unknown)}")
+
+        new = [t for t in valid if t not in subscription.tickers]
+        if len(subscription.tickers) + len(new) > MAX_STREAM_TICKERS:
+            await send_error(f"Stream at most {MAX_STREAM_TICKERS} tickers")
+            return
+
+        quote_broadcaster.subscribe(subscription, new)
+
+    async def send_updates():
+        while True:
+            batch = await subscription.next_batch()
+            await websocket.send_text(orjson.dumps({"quotes": batch}).decode())
+
+    sender = asyncio.create_task(send_updates())
+    try:
+        await subscribe(tickers)
+
+        while True:
+            try:
+                message = orjson.loads(await websocket.receive_text())
+                action = message["action"]
+                if not isinstance(message["tickers"], list):
+                    raise TypeError
+                requested = ",".join(message["tickers"])
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                await send_error("Expected an action and a list of tickers")
+                continue
+
+            if action == "subscribe":
+                await subscribe(requested)
+            elif action == "unsubscribe":
+                valid, _ = parse_stream_tickers(requested)
+                quote_broadcaster.unsubscribe(subscription, valid)
+            else:
+                await send_error(f"Unknown action: {action}")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        quote_broadcaster.disconnect(subscription)
+
+
+@app.get("/metrics")
+def get_metrics():
+    return {
+        "price_cache": price_cache.stats(),
+        "model_registry": model_registry.stats(),
+        "prediction_pool": prediction_pool.stats(),
+        "quotes": quote_service.stats(),
+        "quote_stream": quote_broadcaster.stats(),
+        "ticker_universe": ticker_universe.stats(),
+    }
+
 
 # USER
 @app.post("/register", response_model=schemas.User)
-async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = (
-        db.query(models.User).filter(models.User.username == user.username).first()
+async def register_user(
+    user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)
+):
+    db_user = await db.scalar(
+        select(models.User).where(models.User.username == user.username)
     )
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = auth.get_password_hash(user.password)
+    # bcrypt is deliberately slow, keep it off the event loop
+    hashed_password = await run_in_threadpool(auth.get_password_hash, user.password)
     new_user = models.User(
         username=user.username,
         email=user.email,
@@ -239,19 +441,22 @@ async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db))
         balance=0.0,
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 @app.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = (
-        db.query(models.User).filter(models.User.username == form_data.username).first()
+    user = await db.scalar(
+        select(models.User).where(models.User.username == form_data.username)
     )
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    if not user or not await run_in_threadpool(
+        auth.verify_password, form_data.password, user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -262,7 +467,7 @@ async def login_for_access_token(
 
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
 ):
     username = auth.verify_token(token)
     if username is None:
@@ -271,12 +476,32 @@ async def get_current_user(
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = await db.scalar(select(models.User).where(models.User.username == username))
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
+async def get_optional_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if token is None:
+        return None
+    return await get_current_user(token, db)
+
+
+async def bump_details_version(db: AsyncSession, user: models.User):
+    # Incremented in SQL so concurrent writes of one user can't lose a bump.
+    # The row is read again on the next request, the loaded user is left as is.
+    await db.execute(
+        update(models.User)
+        .where(models.User.id == user.id)
+        .values(details_version=models.User.details_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
 @app.get("/users/me", response_model=schemas.User)
 async def read_users_me(current_user: models.User = Depends(get_current_user)):
     return current_user
@@ -284,32 +509,51 @@ async def read_users_me(current_user: models.User = Depends(get_current_user)):
 
 @app.get("/users/details", response_model=schemas.UserDetails)
 async def read_users_details(
-    current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)
+    request: Request,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # Fetch holdings, transactions, and watchlist
-    holdings = (
-        db.query(models.StockHolding)
-        .filter(models.StockHolding.user_id == current_user.id)
-        .all()
+    # Bumped by every change to the user's transactions or watchlist
+    headers, cached = not_modified(
+        request,
+        f'W/"{current_user.id}-{current_user.details_version}"',
+        private=True,
+    )
+    if cached:
+        return cached
+
+    # Fetch holdings, transactions, and watchlist as column tuples, in the
+    # order of the response schemas' fields
+    holdings = await db.execute(
+        schema_query(schemas.StockHolding, models.StockHolding).where(
+            models.StockHolding.user_id == current_user.id
+        )
     )
-    transactions = (
-        db.query(models.Transaction)
-        .filter(models.Transaction.user_id == current_user.id)
+    transactions = await db.execute(
+        schema_query(schemas.Transaction, models.Transaction)
+        .where(models.Transaction.user_id == current_user.id)
         .order_by(models.Transaction.trade_date.asc())
-        .all()
     )
-    watchlist = (
-        db.query(models.Watchlist)
-        .filter(models.Watchlist.user_id == current_user.id)
-        .all()
+    watchlist = await db.execute(
+        schema_query(schemas.Watchlist, models.Watchlist).where(
+            models.Watchlist.user_id == current_user.id
+        )
     )
 
-    return {
-        "user": current_user,
-        "holdings": holdings,
-        "transactions": transactions,
-        "watchlist": watchlist,
-    }
+    return json_response(
+        {
+            "user": {
+                field: getattr(current_user, field)
+                for field in schemas.User.model_fields
+            },
+            "holdings": schema_records(schemas.StockHolding.model_fields, holdings),
+            "transactions": schema_records(
+                schemas.Transaction.model_fields, transactions
+            ),
+            "watchlist": schema_records(schemas.Watchlist.model_fields, watchlist),
+        },
+        headers=headers,
+    )
 
 
 # Execute a transaction (buy, sell, deposit, withdraw)
@@ -317,12 +561,8 @@ async def read_users_details(
 async def execute_transaction(
     transaction: schemas.TransactionCreate,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    transaction_ticker_upper = (
-        transaction.ticker.upper() if transaction.ticker is not None else None
-    )
-
     db_transaction = models.Transaction()
 
     # Handle the trade_date logic (use the provided date or default to today)
@@ -354,8 +594,7 @@ async def execute_transaction(
 
     # Handle "buy" transactions
     elif transaction.transaction_type == "buy":
-        if transaction_ticker_upper not in tickers_sp500:
-            raise HTTPException(status_code=400, detail="Ticker not found")
+        transaction_ticker_upper = validate_ticker(transaction.ticker or "")
 
         if transaction.shares is None:
             raise HTTPException(status_code=400, detail="Invalid number of shares")
@@ -369,13 +608,11 @@ async def execute_transaction(
         current_user.balance -= cost
 
         # Check if ticker is in watchlist and add if it is not
-        watchlist_item = (
-            db.query(models.Watchlist)
-            .filter(
+        watchlist_item = await db.scalar(
+            select(models.Watchlist).where(
                 models.Watchlist.user_id == current_user.id,
                 models.Watchlist.ticker == transaction_ticker_upper,
             )
-            .first()
         )
         if not watchlist_item:
             new_watchlist_item = models.Watchlist(
@@ -384,13 +621,11 @@ async def execute_transaction(
             db.add(new_watchlist_item)
 
         # Add stock to holdings or update existing
-        holding = (
-            db.query(models.StockHolding)
-            .filter(
+        holding = await db.scalar(
+            select(models.StockHolding).where(
                 models.StockHolding.user_id == current_user.id,
                 models.StockHolding.ticker == transaction_ticker_upper,
             )
-            .first()
         )
         if holding:
             holding.shares += transaction.shares
@@ -413,19 +648,16 @@ async def execute_transaction(
 
     # Handle "sell" transactions
     elif transaction.transaction_type == "sell":
-        if transaction_ticker_upper not in tickers_sp500:
-            raise HTTPException(status_code=400, detail="Ticker not found")
+        transaction_ticker_upper = validate_ticker(transaction.ticker or "")
 
         if transaction.shares is None:
             raise HTTPException(status_code=400, detail="Invalid number of shares")
 
-        holding = (
-            db.query(models.StockHolding)
-            .filter(
+        holding = await db.scalar(
+            select(models.StockHolding).where(
                 models.StockHolding.user_id == current_user.id,
                 models.StockHolding.ticker == transaction_ticker_upper,
             )
-            .first()
         )
         if holding is None or holding.shares < transaction.shares:
             raise HTTPException(status_code=400, detail="Insufficient shares to sell")
@@ -434,7 +666,7 @@ async def execute_transaction(
 
         # Remove holding if all shares are sold
         if holding.shares == 0:
-            db.delete(holding)
+            await db.delete(holding)
 
         db_transaction = models.Transaction(
             user_id=current_user.id,
@@ -447,52 +679,50 @@ async def execute_transaction(
 
     # Record the transaction and commit changes
     db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
+    await bump_details_version(db, current_user)
+    await db.commit()
+    await db.refresh(db_transaction)
 
     return db_transaction
 
 
 @app.get("/watchlist", response_model=List[schemas.Watchlist])
 async def get_watchlist(
-    current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     watchlist = (
-        db.query(models.Watchlist)
-        .filter(models.Watchlist.user_id == current_user.id)
-        .all()
-    )
+        await db.scalars(
+            select(models.Watchlist).where(models.Watchlist.user_id == current_user.id)
+        )
+    ).all()
     return watchlist
 
 
 @app.post("/watchlist", response_model=schemas.Watchlist)
 async def add_to_watchlist(
     ticker: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    if ticker.upper() not in tickers_sp500:
-        raise HTTPException(status_code=400, detail="Ticker not found")
+    ticker_upper = validate_ticker(ticker)
 
     # Check if the ticker is already in the watchlist
-    existing = (
-        db.query(models.Watchlist)
-        .filter(
+    existing = await db.scalar(
+        select(models.Watchlist).where(
             models.Watchlist.user_id == current_user.id,
-            models.Watchlist.ticker == ticker.upper(),
+            models.Watchlist.ticker == ticker_upper,
         )
-        .first()
     )
 
     if existing:
         raise HTTPException(status_code=400, detail="Ticker already in watchlist")
 
-    new_watchlist_item = models.Watchlist(
-        user_id=current_user.id, ticker=ticker.upper()
-    )
+    new_watchlist_item = models.Watchlist(user_id=current_user.id, ticker=ticker_upper)
     db.add(new_watchlist_item)
-    db.commit()
-    db.refresh(new_watchlist_item)
+    await bump_details_version(db, current_user)
+    await db.commit()
+    await db.refresh(new_watchlist_item)
 
     return new_watchlist_item
 
@@ -500,39 +730,158 @@ async def add_to_watchlist(
 @app.delete("/watchlist/{ticker}")
 async def delete_from_watchlist(
     ticker: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    watchlist_item = (
-        db.query(models.Watchlist)
-        .filter(
+    watchlist_item = await db.scalar(
+        select(models.Watchlist).where(
             models.Watchlist.user_id == current_user.id,
-            models.Watchlist.ticker == ticker.upper(),
+            models.Watchlist.ticker == canonical_ticker(ticker),
         )
-        .first()
     )
 
     if not watchlist_item:
         raise HTTPException(status_code=404, detail="Ticker not found in watchlist")
 
-    db.delete(watchlist_item)
-    db.commit()
+    await db.delete(watchlist_item)
+    await bump_details_version(db, current_user)
+    await db.commit()
 
     return {"message": f"{ticker} removed from watchlist"}
 
 
-# Continuous data seeding in the background
-def continuous_seed():
-    while True:
-        seed_data()
-        time.sleep(60 * 60)  # Run every hour
+# BATCH PREDICTIONS
+@app.post("/predict/batch")
+async def predict_batch(
+    request: schemas.BatchPredictionRequest,
+    current_user: Optional[models.User] = Depends(get_optional_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if request.model not in MODELS:
+        raise HTTPException(status_code=404, detail="No model found for prediction")
+
+    tickers = [canonical_ticker(ticker) for ticker in request.tickers]
+
+    # Resolve "my watchlist" / "my holdings" for the current user
+    if request.source is not None:
+        if current_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        if request.source == "watchlist":
+            table = models.Watchlist
+        elif request.source == "holdings":
+            table = models.StockHolding
+        else:
+            raise HTTPException(status_code=400, detail="Unknown ticker source")
+
+        tickers += (
+            await db.scalars(
+                select(table.ticker).where(table.user_id == current_user.id)
+            )
+        ).all()
 
+    tickers = list(dict.fromkeys(tickers))  # Drop duplicates, keep order
+    if not tickers:
+        raise HTTPException(status_code=400, detail="No tickers to predict")
+    if len(tickers) > MAX_BATCH_TICKERS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_BATCH_TICKERS} tickers per batch"
+        )
 
-def start_background_task():
-    threading.Thread(target=continuous_seed, daemon=True).start()
+    # All the database work happens before streaming starts
+    tradable = ticker_universe.tradable()
+    known_tickers = [ticker for ticker in tickers if ticker in tradable]
+    # The price and forecast readers are shared with the sync code paths
+    histories = await db.run_sync(get_price_histories, known_tickers)
+    forecasts = await db.run_sync(
+        read_forecasts,
+        request.model,
+        {
+            ticker: history.last_trade_date
+            for ticker, history in histories.items()
+            if len(history)
+        },
+        request.days_to_predict,
+    )
 
+    def ndjson_line(ticker: str, predicted=None, error: Optional[str] = None):
+        # Once streaming has started an exception would cut the response
+        # short, so a ticker that can't be serialized gets an error line
+        if error is None:
+            try:
+                line = {
+                    "ticker": ticker,
+                    "model": request.model,
+                    "predictions": prediction_records(predicted),
+                }
+                return orjson.dumps(line, default=encode_default) + b"\n"
+            except Exception as e:
+                error = f"Error serializing predictions: {str(e)}"
+
+        return orjson.dumps({"ticker": ticker, "error": error}) + b"\n"
+
+    # Tickers answered without training go out first
+    ready, pending = [], []
+    for ticker in tickers:
+        if ticker not in histories:
+            ready.append(ndjson_line(ticker, error="Ticker not found"))
+        elif not len(histories[ticker]):
+            ready.append(
+                ndjson_line(ticker, error="No stocks found for the given criteria")
+            )
+        elif forecasts.get(ticker) is not None:
+            ready.append(ndjson_line(ticker, forecasts[ticker]))
+        else:
+            pending.append(ticker)
+
+    # Batch models predict their tickers together, a group per batch worker
+    size = 1
+    if request.model in BATCH_MODELS:
+        size = -(-len(pending) // prediction_pool.batch_workers)
+        size = min(max(size, 1), MAX_BATCH_GROUP)
+    groups = [pending[i : i + size] for i in range(0, len(pending), size)]
+
+    async def predict_group(group):
+        datas = {ticker: histories[ticker].to_frame() for ticker in group}
+        try:
+            async with prediction_pool.batch_slots:
+                if request.model in BATCH_MODELS:
+                    predicted, errors = await prediction_pool.predict_many(
+                        request.model, datas, request.days_to_predict
+                    )
+                else:
+                    (ticker,) = group
+                    predicted = {
+                        ticker: await prediction_pool.predict(
+                            ticker,
+                            request.model,
+                            datas[ticker],
+                            request.days_to_predict,
+                        )
+                    }
+                    errors = {}
+        except Exception as e:
+            predicted, errors = {}, dict.fromkeys(group, str(e))
+
+        return [
+            ndjson_line(ticker, predicted.get(ticker), errors.get(ticker))
+            for ticker in group
+        ]
+
+    # One NDJSON line per ticker, in the order they complete
+    async def stream_predictions():
+        for line in ready:
+            yield line
+        for lines in asyncio.as_completed([predict_group(g) for g in groups]):
+            for line in await lines:
+                yield line
+
+    return StreamingResponse(stream_predictions(), media_type="application/x-ndjson")
 
-start_background_task()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -1,73 +1,201 @@
-import yfinance as yf
+import argparse
+import json
+import os
+import time
 import pandas as pd
 
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert
-from datetime import datetime
+from sqlalchemy import func, text
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
 
-from app.database import SessionLocal
-from app.models import Stock
+from app.cache import PRICES_CHANNEL
+from app.database import SessionLocal, engine
+from app.models import TickerFreshness
+from app.sources import get_source
+from app.stores import STOCK_COLUMNS, price_store
+from app.universe import ticker_universe
+from ai_models.trading_calendar import (
+    MARKET_TIMEZONE,
+    is_trading_day,
+    last_closed_session,
+)
+from forecast import forecast_data
 
+# Number of tickers fetched concurrently
+SEED_WORKERS = int(os.getenv("SEED_WORKERS", "8"))
 
-def insert_stock_data(ticker: str, db: Session):
-    # Get the latest trade date for the given ticker
-    latest_record = (
-        db.query(Stock)
-        .filter(Stock.ticker == ticker)
-        .order_by(Stock.trade_date.desc())
-        .first()
+# Postgres advisory lock held by the running seeder daemon, so only one
+# instance seeds at a time however many are deployed
+SEED_LOCK_KEY = 5_739_001
+
+# Runs on trading days as comma separated HH:MM in the exchange's time zone,
+# by default half an hour after the 16:00 close once the final bars are out
+SEED_SCHEDULE = sorted(
+    tuple(int(part) for part in entry.strip().split(":"))
+    for entry in os.getenv("SEED_SCHEDULE", "16:30").split(",")
+    if entry.strip()
+)
+
+
+def get_freshness(tickers, db: Session):
+    # (latest stored bar, latest session fetched up to) of every ticker.
+    # Tickers seeded before freshness was tracked fall back to their latest bar.
+    freshness = {ticker: (None, None) for ticker in tickers}
+    rows = (
+        db.query(
+            TickerFreshness.ticker,
+            TickerFreshness.last_trade_date,
+            TickerFreshness.checked_session,
+        )
+        .filter(TickerFreshness.ticker.in_(tickers))
+        .all()
     )
+    for ticker, last_trade_date, checked_session in rows:
+        freshness[ticker] = (last_trade_date, checked_session)
+
+    untracked = [ticker for ticker, (_, checked) in freshness.items() if not checked]
+    if untracked:
+        for ticker, last_trade_date in price_store.latest_trade_dates(
+            db, untracked
+        ).items():
+            freshness[ticker] = (last_trade_date, None)
+
+    return freshness
+
+
+def plan_fetch_windows(freshness, last_session: date):
+    # Start date of every ticker still missing bars up to last_session, or
+    # None for tickers with no bars at all
+    windows = {}
+    for ticker, (last_trade_date, checked_session) in freshness.items():
+        if checked_session and checked_session >= last_session:
+            continue
+        if last_trade_date and last_trade_date >= last_session:
+            continue
+
+        # The latest stored bar is final, start the day after it
+        windows[ticker] = (
+            last_trade_date + timedelta(days=1) if last_trade_date else None
+        )
+
+    up_to_date = len(freshness) - len(windows)
+    if up_to_date:
+        print(f"{up_to_date} tickers are up to date through {last_session}, skipping.")
+
+    return windows
+
+
+def mark_fresh(
+    ticker: str, checked_session: date, last_trade_date: Optional[date], db: Session
+):
+    # Even an empty fetch counts, a late bar is picked up after the next session
+    stmt = pg_insert(TickerFreshness).values(
+        ticker=ticker,
+        last_trade_date=last_trade_date,
+        checked_session=checked_session,
+        checked_at=func.now(),
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[TickerFreshness.ticker],
+            set_={
+                "last_trade_date": func.greatest(
+                    TickerFreshness.last_trade_date, stmt.excluded.last_trade_date
+                ),
+                "checked_session": stmt.excluded.checked_session,
+                "checked_at": stmt.excluded.checked_at,
+            },
+        )
+    )
+    db.commit()
 
-    if latest_record:
-        latest_trade_date = latest_record.trade_date
-        print(f"The latest trade date of {ticker} is: {latest_trade_date}.")
-        data = yf.download(
-            ticker, start=latest_trade_date, end=datetime.now()
-        )  # Fetch stock data from latest trade date
+
+def fetch_stock_data(ticker: str, start_date: Optional[date], end_date: date, source):
+    start = time.perf_counter()
+
+    if start_date:
+        print(f"Fetching {ticker} from {start_date} to {end_date}.")
     else:
         print(f"No records of {ticker} found.")
-        data = yf.download(ticker, period="5y")  # Fetch the latest 5 year of stock data
-
-    # Reset index
-    data.reset_index(inplace=True)
-
-    # Insert fetched data into the corresponding table
-    for _, row in data.iterrows():
-        new_record = {
-            "ticker": ticker,  # Include ticker in the record
-            "trade_date": row["Date"].iloc[0].date(),
-            "open_price": row["Open"][ticker],
-            "high_price": row["High"][ticker],
-            "low_price": row["Low"][ticker],
-            "close_price": row["Close"][ticker],
-            "volume": row["Volume"][ticker],
-        }
-
-        stmt = insert(Stock).values(new_record)
-        stmt = stmt.on_conflict_do_nothing(
-            index_elements=["ticker", "trade_date"]
-        )  # Handle conflicts by doing nothing
-
-        db.execute(stmt)
+    data = source.fetch(ticker, start=start_date, end=end_date)
+
+    # Leave out the bar of a session that hasn't closed yet
+    data = data[data.index.date <= end_date]
+
+    elapsed = time.perf_counter() - start
+    print(f"Fetched {len(data)} rows of {ticker} in {elapsed:.2f}s.")
+    return data
+
+
+def insert_stock_data(ticker: str, db: Session, source=None):
+    source = source or get_source()
+    last_session = last_closed_session(datetime.now(timezone.utc))
+    windows = plan_fetch_windows(get_freshness([ticker], db), last_session)
+    if ticker not in windows:
+        return 0
+
+    data = fetch_stock_data(ticker, windows[ticker], last_session, source)
+    inserted = write_stock_data(ticker, data, db)
+    if not data.empty:
+        mark_fresh(ticker, last_session, data.index.max().date(), db)
+    return inserted
+
+
+def build_stock_frame(ticker: str, data: pd.DataFrame):
+    # Build the rows column-wise instead of walking the frame row by row
+    return pd.DataFrame(
+        {
+            "ticker": ticker,
+            "trade_date": data.index.date,
+            "open_price": data["Open"].to_numpy(dtype=float),
+            "high_price": data["High"].to_numpy(dtype=float),
+            "low_price": data["Low"].to_numpy(dtype=float),
+            "close_price": data["Close"].to_numpy(dtype=float),
+            "volume": data["Volume"].to_numpy(dtype=float),
+        },
+        columns=STOCK_COLUMNS,
+    )
+
+
+def write_stock_data(ticker: str, data: pd.DataFrame, db: Session):
+    if data.empty:
+        print(f"No new data of {ticker} to write.")
+        return 0
+
+    start = time.perf_counter()
+    frame = build_stock_frame(ticker, data)
+
+    inserted = price_store.write(db, ticker, frame)
+
+    # Delivered on commit, API processes drop their cached history
+    if inserted:
+        db.execute(
+            text("SELECT pg_notify(:channel, :ticker)"),
+            {"channel": PRICES_CHANNEL, "ticker": ticker},
+        )
 
     db.commit()
 
+    elapsed = time.perf_counter() - start
+    rate = len(frame) / elapsed if elapsed > 0 else 0
+    print(
+        f"Wrote {len(frame)} rows of {ticker} ({inserted} new) "
+        f"in {elapsed:.2f}s, {rate:.0f} rows/sec."
+    )
+    return inserted
+
 
-def seed_data():
+def seed_data(tickers=None, source=None, workers=SEED_WORKERS):
     db = SessionLocal()
+    source = source or get_source()
 
-    # You can uncomment this to fetch the S&P 500 tickers if needed
-    # df_sp500 = pd.read_html(
-    #     "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
-    # )[0]
-    # tickers_sp500 = df_sp500.Symbol.to_list()  # List of tickers in SP500
-    #
-    # Some ticker like "BRK.B" need to be mapped to "BRK-B"
-    # tickers_sp500 = list(map(lambda x: x.replace(".", "-"), tickers_sp500))
-    # tickers_sp500.append("^GSPC")  # Add S&P500 index
+    # Pass list(ticker_universe) to seed every S&P 500 ticker and the index
 
     # Example tickers for testing
-    tickers = [
+    tickers = tickers or [
         "AAPL",
         "AMZN",
         "MSFT",
@@ -84,15 +212,154 @@ def seed_data():
         "^GSPC",
     ]
 
+    # Canonical forms, tickers outside the universe are skipped
+    infos = [ticker_universe.lookup(ticker) for ticker in tickers]
+    unknown = [ticker for ticker, info in zip(tickers, infos) if info is None]
+    if unknown:
+        print(f"Skipping unknown tickers: {', '.join(unknown)}.")
+    tickers = list(dict.fromkeys(info.ticker for info in infos if info is not None))
+
     print("\n======================\nFetching stock data...\n======================\n")
 
-    for ticker in tickers:
-        insert_stock_data(ticker, db)
+    start = time.perf_counter()
+
+    # Only ask upstream for sessions that have closed since the last fetch
+    last_session = last_closed_session(datetime.now(timezone.utc))
+    freshness = get_freshness(tickers, db)
+    windows = plan_fetch_windows(freshness, last_session)
+
+    # Fetch concurrently, while this thread writes each result as it arrives
+    inserted = 0
+    errors = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    fetch_stock_data, ticker, start_date, last_session, source
+                ): ticker
+                for ticker, start_date in windows.items()
+            }
+
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    data = future.result()
+                    inserted += write_stock_data(ticker, data, db)
 
+                    last_trade_date = freshness[ticker][0]
+                    if not data.empty:
+                        last_trade_date = data.index.max().date()
+                    mark_fresh(ticker, last_session, last_trade_date, db)
+                except Exception as e:
+                    db.rollback()
+                    errors += 1
+                    print(f"Error seeding {ticker}: {str(e)}")
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - start
+
+    print(f"Seeded {len(tickers)} tickers ({inserted} new rows) in {elapsed:.2f}s.")
     print(
         "\n=========================\nData fetched successfully.\n=========================\n"
     )
 
+    return {
+        "session": last_session.isoformat(),
+        "tickers": len(tickers),
+        "fetched": len(windows),
+        "rows": inserted,
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+    }
+
+
+def hold_seed_lock(conn=None, retry: float = 60):
+    # Returns a connection holding the seeder lock, waiting while another
+    # instance has it. The lock lives as long as the connection does.
+    while True:
+        try:
+            if conn is not None:
+                conn.execute(text("SELECT 1"))
+                conn.commit()
+                return conn
+
+            conn = engine.connect()
+            held = conn.scalar(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": SEED_LOCK_KEY}
+            )
+            conn.commit()
+            if held:
+                return conn
+
+            conn.close()
+            conn = None
+            print("Another seeder holds the lock, waiting.")
+        except Exception as e:
+            print(f"Error taking the seeder lock: {str(e)}")
+            if conn is not None:
+                conn.invalidate()
+                conn.close()
+            conn = None
+
+        time.sleep(retry)
+
+
+def next_run(now: datetime, schedule=SEED_SCHEDULE) -> datetime:
+    # The first scheduled time on a trading day after now
+    local = now.astimezone(MARKET_TIMEZONE)
+    for days in range(8):
+        day = local.date() + timedelta(days=days)
+        if not is_trading_day(day):
+            continue
+
+        for hour, minute in schedule:
+            run_at = datetime(
+                day.year, day.month, day.day, hour, minute, tzinfo=MARKET_TIMEZONE
+            )
+            if run_at > local:
+                return run_at
+
+    raise ValueError("SEED_SCHEDULE has no run times")
+
+
+def run_once():
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    metrics = {
+        "started_at": started_at.isoformat(),
+        "seed": seed_data(),
+        "forecast": forecast_data(),
+    }
+    metrics["seconds"] = round(time.perf_counter() - start, 2)
+
+    print(f"Seeder run: {json.dumps(metrics)}")
+    return metrics
+
+
+def run_daemon(schedule=SEED_SCHEDULE):
+    # Catch up once on start, then follow the schedule
+    lock = None
+    while True:
+        lock = hold_seed_lock(lock)
+        try:
+            run_once()
+        except Exception as e:
+            print(f"Error in seeder run: {str(e)}")
+
+        run_at = next_run(datetime.now(timezone.utc), schedule)
+        print(f"Next seeder run at {run_at.isoformat()}.")
+        time.sleep(max((run_at - datetime.now(timezone.utc)).total_seconds(), 0))
+
 
 if __name__ == "__main__":
-    seed_data()
+    parser = argparse.ArgumentParser(description="Seed stock prices and forecasts")
+    parser.add_argument(
+        "--daemon", action="store_true", help="keep running on SEED_SCHEDULE"
+    )
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon()
+    else:
+        run_once()
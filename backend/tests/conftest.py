@@ -0,0 +1,9 @@
+import os
+
+# Engines are created on import but only connect on first use
+os.environ.setdefault("DATABASE_URL", "postgresql://postgres@localhost/postgres")
+
+# app.auth reads these on import
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
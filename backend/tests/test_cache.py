@@ -0,0 +1,69 @@
+import numpy as np
+
+from datetime import date
+
+from app import cache
+from app.prices import VALUE_FIELDS, PriceHistory
+
+
+class FakeStore:
+    def __init__(self, daily: PriceHistory):
+        self.daily = daily
+
+    def read(self, db, ticker, interval="daily"):
+        # Rollups as they are stored, aggregated over the full history
+        return self.daily.resample(interval)
+
+
+def daily_history() -> PriceHistory:
+    trade_date = np.arange("2024-01-01", "2024-05-01", dtype="datetime64[D]")
+    trade_date = trade_date[np.is_busday(trade_date)]
+    close = np.linspace(100, 200, len(trade_date))
+    values = {field: close + i for i, field in enumerate(VALUE_FIELDS)}
+    return PriceHistory("AAPL", trade_date, values)
+
+
+def test_price_range_with_mid_period_bounds(monkeypatch):
+    daily = daily_history()
+    monkeypatch.setattr(cache, "price_store", FakeStore(daily))
+    monkeypatch.setattr(cache, "price_cache", cache.PriceCache(8))
+
+    # Both bounds fall on a Wednesday in the middle of a month
+    start_date, end_date = date(2024, 1, 17), date(2024, 3, 13)
+    in_range = daily.slice(start_date, end_date)
+
+    for interval in ("weekly", "monthly"):
+        bars = cache.get_price_range(None, "AAPL", interval, start_date, end_date)
+        expected = in_range.resample(interval)
+
+        # The first bar is partial rather than dropped, and the last one
+        # stops at end_date
+        assert bars.trade_date[0] == np.datetime64(start_date)
+        assert bars.values["open_price"][0] == in_range.values["open_price"][0]
+        assert bars.values["close_price"][-1] == in_range.values["close_price"][-1]
+        np.testing.assert_array_equal(bars.trade_date, expected.trade_date)
+        for field in VALUE_FIELDS:
+            np.testing.assert_array_equal(bars.values[field], expected.values[field])
+
+
+class RacingStore(FakeStore):
+    def read(self, db, ticker, interval="daily"):
+        # The seeder commits and notifies while this miss is being read
+        history = super().read(db, ticker, interval)
+        cache.price_cache.invalidate(ticker)
+        return history
+
+
+def test_miss_read_across_an_invalidation_is_not_cached(monkeypatch):
+    monkeypatch.setattr(cache, "price_store", RacingStore(daily_history()))
+    monkeypatch.setattr(cache, "price_cache", cache.PriceCache(8))
+
+    history = cache.get_price_history(None, "AAPL")
+
+    assert len(history)
+    assert cache.price_cache.get("AAPL") is None
+
+    # Reads that don't race an invalidation are cached as usual
+    monkeypatch.setattr(cache, "price_store", FakeStore(daily_history()))
+    history = cache.get_price_history(None, "AAPL", "weekly")
+    assert cache.price_cache.get(("AAPL", "weekly")) is history
@@ -0,0 +1,51 @@
+import forecast
+
+from datetime import date
+
+from forecast import group_forecasts, plan_forecasts
+
+
+def test_group_forecasts_batches_xgboost_per_worker():
+    base_date = date(2024, 11, 1)
+    tickers = ["AAPL", "MSFT", "NVDA", "AMZN", "GOOG"]
+    jobs = [
+        (ticker, model, base_date)
+        for ticker in tickers
+        for model in ("regression", "xgboost")
+    ]
+
+    groups = group_forecasts(jobs, workers=2)
+
+    assert [list(base_dates) for model, base_dates in groups if model == "xgboost"] == [
+        ["AAPL", "MSFT", "NVDA"],
+        ["AMZN", "GOOG"],
+    ]
+    assert [
+        list(base_dates) for model, base_dates in groups if model == "regression"
+    ] == [[ticker] for ticker in tickers]
+
+
+class StoredPrices:
+    def latest_trade_dates(self, db):
+        return dict.fromkeys(["AAPL", "^GSPC", "DELISTED"], date(2024, 11, 1))
+
+
+class NoForecasts:
+    # Stands in for the Session, the predictions table is empty
+    def query(self, *columns):
+        return self
+
+    def group_by(self, *columns):
+        return self
+
+    def all(self):
+        return []
+
+
+def test_plan_forecasts_skips_untradable_tickers(monkeypatch):
+    monkeypatch.setattr(forecast, "price_store", StoredPrices())
+
+    jobs = plan_forecasts(NoForecasts())
+
+    assert {ticker for ticker, model, base_date in jobs} == {"AAPL"}
+    assert len(jobs) == len(forecast.MODELS)
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from concurrent.futures.process import BrokenProcessPool
+
+from ai_models.pool import PredictionPool, run_prediction, run_predictions
+
+
+def history(rows: int = 60) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Datetime": pd.bdate_range("2024-01-01", periods=rows),
+            "Open": np.linspace(99, 159, rows),
+            "High": np.linspace(101, 161, rows),
+            "Low": np.linspace(98, 158, rows),
+            "Close": np.linspace(100, 160, rows),
+            "Adj Close": np.linspace(100, 160, rows),
+            "Volume": np.full(rows, 1e6),
+        }
+    )
+
+
+def test_broken_pool_is_replaced():
+    pool = PredictionPool(workers=1, max_pending=4)
+
+    async def scenario():
+        # A worker exiting mid-job breaks the executor like an OOM kill would
+        broken = pool._get_executor()
+        with pytest.raises(BrokenProcessPool):
+            await asyncio.wrap_future(broken.submit(os._exit, 1))
+
+        predicted = await pool.predict("AAPL", "regression", history(), 5)
+        return broken, predicted
+
+    try:
+        broken, predicted = asyncio.run(scenario())
+    finally:
+        pool.executor.shutdown()
+
+    assert pool.executor is not broken
+    assert pool.restarts == 1
+    assert len(predicted) == 6
+
+
+def test_run_predictions_batches_xgboost():
+    datas = {
+        "AAPL": history(),
+        "MSFT": history(80),
+        "BAD": history().assign(Close="n/a"),
+    }
+
+    fitted, predicted, errors, _ = run_predictions("xgboost", datas, 10)
+
+    # Same forecasts as one ticker at a time, the unfittable one is reported
+    assert set(fitted) == set(predicted) == {"AAPL", "MSFT"}
+    assert set(errors) == {"BAD"}
+    for ticker in predicted:
+        _, expected, _ = run_prediction("xgboost", datas[ticker], 10)
+        pd.testing.assert_frame_equal(predicted[ticker], expected)
+
+
+def test_batches_never_hold_every_worker():
+    for workers in range(1, 5):
+        pool = PredictionPool(workers=workers, max_pending=4)
+
+        assert pool.batch_workers >= 1
+        assert pool.processes > pool.batch_workers
+        assert pool.processes == max(workers, 2)
@@ -0,0 +1,32 @@
+import pytest
+
+from fastapi.testclient import TestClient
+
+from app.schemas import MAX_DAYS_TO_PREDICT
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("days_to_predict", [-1, MAX_DAYS_TO_PREDICT + 1])
+def test_predict_rejects_out_of_range_horizon(days_to_predict):
+    response = client.get(
+        "/stocks/AAPL/predict",
+        params={"model": "regression", "days_to_predict": days_to_predict},
+    )
+
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("days_to_predict", [-1, MAX_DAYS_TO_PREDICT + 1])
+def test_batch_rejects_out_of_range_horizon(days_to_predict):
+    response = client.post(
+        "/predict/batch",
+        json={
+            "tickers": ["AAPL"],
+            "model": "regression",
+            "days_to_predict": days_to_predict,
+        },
+    )
+
+    assert response.status_code == 422
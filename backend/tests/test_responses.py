@@ -0,0 +1,37 @@
+import orjson
+import numpy as np
+import pandas as pd
+
+from ai_models._prophet import prophet_model, prophet_predict
+from ai_models.linear_regression import linear_model, linear_predict
+from app.responses import json_response, prediction_records
+
+
+def history(rows: int = 60) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Datetime": pd.bdate_range("2024-01-01", periods=rows).date,
+            "Close": np.linspace(100, 160, rows),
+        }
+    )
+
+
+def test_prediction_records_of_every_model_serialize():
+    data = history()
+    regression = linear_predict(linear_model(data), 5, data)
+    # Prophet returns Timestamps rather than dates
+    prophet = prophet_predict(prophet_model(data), 5, data)
+
+    for predicted in (regression, prophet):
+        records = orjson.loads(
+            json_response(prediction_records(predicted, model="test")).body
+        )
+
+        assert [record["trade_date"] for record in records] == [
+            "2024-03-22",
+            "2024-03-25",
+            "2024-03-26",
+            "2024-03-27",
+            "2024-03-28",
+            "2024-04-01",
+        ]
@@ -0,0 +1,27 @@
+from datetime import date
+
+from ai_models.trading_calendar import future_trading_dates
+
+
+def test_future_trading_dates_from_a_session():
+    # Christmas is skipped
+    assert future_trading_dates(date(2024, 12, 20), 3) == [
+        date(2024, 12, 20),
+        date(2024, 12, 23),
+        date(2024, 12, 24),
+        date(2024, 12, 26),
+    ]
+
+
+def test_future_trading_dates_from_a_closed_day():
+    # A Saturday is followed by the Monday, not the session after it
+    assert future_trading_dates(date(2024, 12, 21), 2) == [
+        date(2024, 12, 21),
+        date(2024, 12, 23),
+        date(2024, 12, 24),
+    ]
+    # As is Good Friday
+    assert future_trading_dates(date(2024, 3, 29), 1) == [
+        date(2024, 3, 29),
+        date(2024, 4, 1),
+    ]
@@ -0,0 +1,41 @@
+from app.universe import SNAPSHOT_PATH, read_snapshot
+
+GICS_SECTORS = {
+    "Communication Services",
+    "Consumer Discretionary",
+    "Consumer Staples",
+    "Energy",
+    "Financials",
+    "Health Care",
+    "Industrials",
+    "Information Technology",
+    "Materials",
+    "Real Estate",
+    "Utilities",
+}
+
+
+def test_snapshot_has_a_sector_for_every_ticker():
+    snapshot = read_snapshot(SNAPSHOT_PATH)
+
+    assert len(snapshot) > 500
+    assert {
+        ticker: sector
+        for ticker, (name, sector) in snapshot.items()
+        if sector not in GICS_SECTORS
+    } == {}
+
+
+def test_snapshot_names_are_not_cut_off():
+    snapshot = read_snapshot(SNAPSHOT_PATH)
+    names = [name for name, sector in snapshot.values()]
+
+    # An earlier source capped names at 31 characters, mid word
+    assert max(len(name) for name in names) > 31
+    assert [
+        name
+        for name in names
+        if name.count("(") != name.count(")")
+        or not (name[-1].isalnum() or name[-1] in ".)")
+        or "Common St" in name
+    ] == []
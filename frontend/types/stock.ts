@@ -10,7 +10,6 @@ export interface StockQuote {
 }
 
 export interface StockPrice {
-  id: string;
   high_price: number;
   ticker: string;
   open_price: number;